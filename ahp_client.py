@@ -0,0 +1,435 @@
+"""
+Client library for AI Hypercall Protocol (AHP) servers.
+Provides a synchronous AHPClient and an asyncio AsyncAHPClient.
+"""
+import asyncio
+import base64
+import functools
+import importlib.util
+import time
+import requests
+import json
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ahp_config import URL_MAP, TOKEN_FILE, SESSION_FILE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# HTTP/2 in httpx needs the optional h2 package (pip install "httpx[http2]").
+# find_spec checks for it without paying for the import.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# --- Configuration ---
+TOOLS_CACHE_FILE = Path.home() / ".ahp_tools.json"
+# Renew a bearer token this many seconds before it expires.
+TOKEN_REFRESH_MARGIN = 5
+
+# Only failures where the server never ran the call are retried, with exponential backoff:
+# connection errors, and 429/503 rejections. Tool calls such as apply_diff or save_memory have
+# side effects, so a 502/504 or a read timeout (the work may have happened) is not resent, and
+# POST /batch is never retried. The final response is returned (not raised) so the usual error reporting still applies.
+RETRY_POLICY = Retry(
+    total=3,
+    connect=3,
+    read=0,
+    status=3,
+    backoff_factor=0.2,
+    status_forcelist=(429, 503),
+    allowed_methods=frozenset(["GET"]),
+    raise_on_status=False
+)
+
+def _loads(content: bytes):
+    """Decodes a JSON body straight from bytes, using orjson when it is installed."""
+    return orjson.loads(content) if orjson else json.loads(content)
+
+def _body_excerpt(response, limit: int = 512) -> str:
+    """
+    Returns the start of a response body for error output.
+    Decoding a bounded byte slice skips charset detection and full decoding of large error pages.
+    """
+    return response.content[:limit].decode("utf-8", "replace")
+
+def dumps_pretty(data) -> str:
+    """Formats data as indented JSON for display."""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, indent=2)
+
+class AHPClient:
+    """
+    A client for interacting with an AI Hypercall Protocol (AHP) server.
+    Handles authentication and session management automatically.
+    """
+    def __init__(self, base_url: str, token: str):
+        self.base_url = base_url
+        self.token = token
+        self.bearer_token = None
+        self.session_id = None
+        self._session_params = {}
+        self._bearer_expires_at = float("inf")
+
+        # A single pooled session keeps the TCP/TLS connection alive across calls.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=RETRY_POLICY)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # Reuse the token and session saved by a previous run (or by ahp_curl.py) when available.
+        if not self._load_cached_credentials():
+            self._authenticate_and_start_session()
+
+    def close(self):
+        """Closes the underlying HTTP session and its pooled connections."""
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _json_fast(self, response, tool_name):
+        """
+        Decodes a successful tool response directly; anything else (errors, empty bodies, bad JSON)
+        goes through _get_json_or_raise, so its reporting is only paid for on the slow path.
+        """
+        if response.status_code < 400 and response.content:
+            try:
+                return _loads(response.content)
+            except ValueError:
+                pass
+        return self._get_json_or_raise(response, f"tool call to '{tool_name}'")
+
+    def _get_json_or_raise(self, response, step_name):
+        """Helper to decode JSON or raise a detailed exception."""
+        try:
+            response.raise_for_status()
+            if response.status_code == 204:
+                return {"success": True, "message": "Operation successful with no content."}
+            return _loads(response.content)
+        except json.JSONDecodeError:
+            print(f"Error: Failed to decode JSON from {step_name}.")
+            print(f"Status Code: {response.status_code}")
+            print(f"Response Text: {_body_excerpt(response)}")
+            raise
+        except requests.exceptions.HTTPError as e:
+            print(f"Error: HTTP error during {step_name}.")
+            print(f"Status Code: {e.response.status_code}")
+            print(f"Response Text: {_body_excerpt(e.response)}")
+            raise
+
+    def _load_cached_credentials(self) -> bool:
+        """Loads a previously saved bearer token and session ID. Returns True if both were found."""
+        try:
+            self.bearer_token = TOKEN_FILE.read_text().strip()
+            self.session_id = SESSION_FILE.read_text().strip()
+        except OSError:
+            self.bearer_token = self.session_id = None
+            return False
+        if not (self.bearer_token and self.session_id):
+            return False
+        self._apply_credentials()
+        return True
+
+    def _apply_credentials(self):
+        """
+        Sends the bearer token as an Authorization header on every request and
+        sets the session query parameter shared by every tool call.
+        """
+        self._session.headers["Authorization"] = f"Bearer {self.bearer_token}"
+        self._bearer_expires_at = self._token_expiry(self.bearer_token)
+        self._session_params = {"session_id": self.session_id}
+
+    def _save_cached_credentials(self):
+        """Saves the bearer token and session ID for reuse by later runs."""
+        try:
+            TOKEN_FILE.write_text(self.bearer_token)
+            SESSION_FILE.write_text(self.session_id)
+        except OSError as e:
+            print(f"Warning: Could not save credentials: {e}")
+
+    def _clear_cached_credentials(self):
+        """Removes the saved bearer token and session ID."""
+        for path in (TOKEN_FILE, SESSION_FILE):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _credentials_rejected(response) -> bool:
+        """True if the server rejected the bearer token or no longer knows the session."""
+        if response.status_code in (401, 403):
+            return True
+        return response.status_code == 404 and b"session_not_found" in response.content
+
+    def _send_authenticated(self, send):
+        """
+        Sends a request built by `send()` with the current credentials.
+        A bearer token that is about to expire is renewed first, saving the round trip of a doomed request.
+        If saved credentials are rejected, re-authenticates once and resends.
+        """
+        if time.time() > self._bearer_expires_at - TOKEN_REFRESH_MARGIN:
+            self._refresh_bearer_token()
+        response = send()
+        if self._credentials_rejected(response):
+            print("Saved credentials were rejected; re-authenticating...")
+            response.close()
+            self._clear_cached_credentials()
+            self._authenticate_and_start_session()
+            response = send()
+        return response
+
+    @staticmethod
+    def _token_expiry(bearer_token: str) -> float:
+        """
+        Reads the expiration (unix epoch) from a bearer token's payload without verifying it.
+        Returns infinity for tokens it can't read, leaving expiry to the server's 401.
+        """
+        try:
+            encoded_payload = bearer_token.split(".", 1)[0]
+            payload = _loads(base64.urlsafe_b64decode(encoded_payload + "=" * (-len(encoded_payload) % 4)))
+            return float(payload["exp"])
+        except (ValueError, TypeError, KeyError):
+            return float("inf")
+
+    def _fetch_bearer_token(self):
+        """Exchanges the pre-shared token for a bearer token and sends it on later requests."""
+        print("Authenticating...")
+        auth_url = f"{self.base_url}/auth?token={self.token}"
+        auth_response = self._session.get(auth_url)
+        auth_data = self._get_json_or_raise(auth_response, "authentication")
+        self.bearer_token = auth_data.get("bearer_token")
+        if not self.bearer_token:
+            raise ValueError("Failed to get bearer token.")
+        print("Authentication successful.")
+
+        self._session.headers["Authorization"] = f"Bearer {self.bearer_token}"
+        self._bearer_expires_at = self._token_expiry(self.bearer_token)
+
+    def _refresh_bearer_token(self):
+        """Replaces an expiring bearer token; the session belongs to the agent, so it is kept."""
+        self._fetch_bearer_token()
+        self._save_cached_credentials()
+
+    def _authenticate_and_start_session(self):
+        """Gets a bearer token and starts a new session."""
+        self._fetch_bearer_token()
+
+        print("Starting session...")
+        session_url = f"{self.base_url}/session/start"
+        session_response = self._session.get(session_url)
+        session_data = self._get_json_or_raise(session_response, "session start")
+        self.session_id = session_data.get("session_id")
+        if not self.session_id:
+            raise ValueError("Failed to start session.")
+        print(f"Session started successfully: {self.session_id}")
+        self._apply_credentials()
+        self._save_cached_credentials()
+
+    def get_tools(self, max_age: float = 300) -> list:
+        """
+        Returns the server's tool schemas, cached on disk in TOOLS_CACHE_FILE.
+        A cached copy younger than `max_age` seconds is returned without a request;
+        an older one is revalidated with If-None-Match and reused on 304.
+        """
+        try:
+            cache = _loads(TOOLS_CACHE_FILE.read_bytes())
+            if cache.get("base_url") != self.base_url:
+                cache = None
+        except (OSError, ValueError):
+            cache = None
+
+        if cache and time.time() - cache.get("fetched_at", 0) < max_age:
+            return cache["tools"]
+
+        headers = {"If-None-Match": cache["etag"]} if cache and cache.get("etag") else {}
+        response = self._session.get(f"{self.base_url}/tools", headers=headers)
+        if response.status_code == 304 and cache:
+            tools = cache["tools"]
+        else:
+            tools = self._get_json_or_raise(response, "tool listing")
+            cache = {"base_url": self.base_url, "etag": response.headers.get("ETag"), "tools": tools}
+
+        cache["fetched_at"] = time.time()
+        try:
+            TOOLS_CACHE_FILE.write_text(json.dumps(cache))
+        except OSError as e:
+            print(f"Warning: Could not save tools cache: {e}")
+        return tools
+
+    def call_tool(self, tool_name: str, **params) -> dict:
+        """Calls a tool on the AHP server."""
+        if not self.bearer_token or not self.session_id:
+            raise ConnectionError("Client is not authenticated or session is not started.")
+        
+        print(f"\nCalling tool '{tool_name}' with params: {params}")
+        tool_url = f"{self.base_url}/{tool_name}"
+
+        # requests encodes params into the URL once while preparing the request.
+        response = self._send_authenticated(
+            lambda: self._session.get(tool_url, params={**self._session_params, **params})
+        )
+        return self._json_fast(response, tool_name)
+
+    def call_tool_stream(self, tool_name: str, **params):
+        """
+        Calls a tool with streaming enabled and yields each server-sent event as a dict as soon as it arrives,
+        e.g. {"status": "starting"}, {"type": "chunk", "data": ...}, ..., {"status": "finished"}.
+        Memory use stays bounded regardless of the total response size.
+        """
+        if not self.bearer_token or not self.session_id:
+            raise ConnectionError("Client is not authenticated or session is not started.")
+
+        print(f"\nStreaming tool '{tool_name}' with params: {params}")
+        tool_url = f"{self.base_url}/{tool_name}"
+        response = self._send_authenticated(
+            lambda: self._session.get(tool_url, params={**self._session_params, **params, "stream": "true"}, stream=True)
+        )
+        with response:
+            if response.status_code >= 400:
+                self._get_json_or_raise(response, f"streaming tool call to '{tool_name}'")
+            for line in response.iter_lines():
+                if line.startswith(b"data: "):
+                    yield _loads(line[len(b"data: "):])
+
+    def call_tools_batch(self, calls: list) -> list:
+        """
+        Calls several tools in a single round trip via the server's /batch endpoint.
+        `calls` is a list of (tool_name, params) pairs; results are returned in the same order,
+        each either {"tool", "result"} or {"tool", "error"}.
+        """
+        if not self.bearer_token or not self.session_id:
+            raise ConnectionError("Client is not authenticated or session is not started.")
+
+        print(f"\nCalling {len(calls)} tools in a batch: {[tool_name for tool_name, _ in calls]}")
+        body = {"requests": {str(i): {"tool": tool_name, "params": params} for i, (tool_name, params) in enumerate(calls)}}
+        response = self._send_authenticated(lambda: self._session.post(
+            f"{self.base_url}/batch",
+            params=self._session_params,
+            json=body
+        ))
+        responses = self._get_json_or_raise(response, "batch tool call")["responses"]
+        return [responses[str(i)] for i in range(len(calls))]
+
+@functools.lru_cache(maxsize=8)
+def get_client(base_url: str, token: str) -> AHPClient:
+    """
+    Returns a shared, authenticated AHPClient for a server and pre-shared token.
+    Repeated calls in the same process reuse its session and connection pool instead of authenticating again.
+    Do not close() a shared client.
+    """
+    return AHPClient(base_url, token)
+
+def _httpx_status_error():
+    """Returns httpx.HTTPStatusError, importing httpx on first use."""
+    import httpx
+    return httpx.HTTPStatusError
+
+class AsyncAHPClient:
+    """
+    An asyncio client for an AHP server, for issuing many independent tool calls concurrently.
+    Use it as an async context manager: `async with AsyncAHPClient(url, token) as client: ...`
+    """
+    MAX_CONCURRENT_CALLS = 20
+
+    def __init__(self, base_url: str, token: str):
+        self.base_url = base_url
+        self.token = token
+        self.bearer_token = None
+        self.session_id = None
+        # httpx is imported here rather than at module level so the synchronous client
+        # and scripts that only use it don't pay for the import.
+        import httpx
+        # With HTTP/2, concurrent calls are multiplexed as streams over a single connection
+        # instead of each opening its own; it falls back to pooled HTTP/1.1 when h2 is missing.
+        # Keep-alive slots match the concurrency cap so every in-flight call's connection is reused.
+        # Connects fail fast; reads allow for slow tools (httpx's default is 5s for everything).
+        self._session = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=self.MAX_CONCURRENT_CALLS,
+                keepalive_expiry=60
+            ),
+            timeout=httpx.Timeout(60.0, connect=3.0)
+        )
+        # Cap in-flight requests so a large batch doesn't hammer the server.
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CALLS)
+
+    async def __aenter__(self):
+        await self._authenticate_and_start_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Closes the underlying HTTP client and its pooled connections."""
+        await self._session.aclose()
+
+    def _get_json_or_raise(self, response, step_name):
+        """Helper to decode JSON or raise a detailed exception."""
+        try:
+            response.raise_for_status()
+            if response.status_code == 204:
+                return {"success": True, "message": "Operation successful with no content."}
+            return _loads(response.content)
+        except json.JSONDecodeError:
+            print(f"Error: Failed to decode JSON from {step_name}.")
+            print(f"Status Code: {response.status_code}")
+            print(f"Response Text: {_body_excerpt(response)}")
+            raise
+        except _httpx_status_error() as e:
+            print(f"Error: HTTP error during {step_name}.")
+            print(f"Status Code: {e.response.status_code}")
+            print(f"Response Text: {_body_excerpt(e.response)}")
+            raise
+
+    async def _authenticate_and_start_session(self):
+        """Gets a bearer token and starts a new session."""
+        print("Authenticating...")
+        auth_response = await self._session.get(f"{self.base_url}/auth", params={"token": self.token})
+        auth_data = self._get_json_or_raise(auth_response, "authentication")
+        self.bearer_token = auth_data.get("bearer_token")
+        if not self.bearer_token:
+            raise ValueError("Failed to get bearer token.")
+        print("Authentication successful.")
+
+        self._session.headers["Authorization"] = f"Bearer {self.bearer_token}"
+
+        print("Starting session...")
+        session_response = await self._session.get(f"{self.base_url}/session/start")
+        session_data = self._get_json_or_raise(session_response, "session start")
+        self.session_id = session_data.get("session_id")
+        if not self.session_id:
+            raise ValueError("Failed to start session.")
+        print(f"Session started successfully: {self.session_id}")
+
+    async def call_tool(self, tool_name: str, **params) -> dict:
+        """Calls a tool on the AHP server."""
+        if not self.bearer_token or not self.session_id:
+            raise ConnectionError("Client is not authenticated or session is not started.")
+
+        print(f"\nCalling tool '{tool_name}' with params: {params}")
+        all_params = {
+            "session_id": self.session_id,
+            **params
+        }
+
+        async with self._semaphore:
+            response = await self._session.get(f"{self.base_url}/{tool_name}", params=all_params)
+        return self._get_json_or_raise(response, f"tool call to '{tool_name}'")
+
+    async def call_tools_many(self, calls: list) -> list:
+        """
+        Calls several independent tools concurrently.
+        `calls` is a list of (tool_name, params) pairs; results are returned in the same order.
+        """
+        return await asyncio.gather(*[self.call_tool(tool_name, **params) for tool_name, params in calls])
@@ -0,0 +1,12 @@
+"""
+Shared settings for the AHP command-line clients.
+Kept free of heavy imports so ahp_curl.py can use them without loading ahp_client.py.
+"""
+from pathlib import Path
+
+URL_MAP = {
+    "local": "http://localhost:8080",
+    "cloud": "https://ahp.nuts.services"
+}
+TOKEN_FILE = Path.home() / ".ahp_token"
+SESSION_FILE = Path.home() / ".ahp_session"
@@ -1,19 +1,16 @@
 import requests
 import json
-import subprocess
+import shutil
 import sys
 import os
-from pathlib import Path
-import argparse
+from requests.adapters import HTTPAdapter
 
-# --- Configuration ---
-TOKEN_FILE = Path.home() / ".ahp_token"
-SESSION_FILE = Path.home() / ".ahp_session"
+from ahp_config import URL_MAP, TOKEN_FILE, SESSION_FILE
 
-URL_MAP = {
-    "local": "http://localhost:8080",
-    "cloud": "https://ahp.nuts.services"
-}
+# One pooled session so consecutive requests reuse the same TCP/TLS connection.
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_maxsize=10))
+session.mount("https://", HTTPAdapter(pool_maxsize=10))
 
 def save_token(token: str):
     """Saves the bearer token to a local file."""
@@ -43,31 +40,59 @@ def load_session() -> str:
     with open(SESSION_FILE, "r") as f:
         return f.read().strip()
 
+USAGE = """usage: ahp_curl.py [--env {local,cloud}] command [args ...]
+
+A curl wrapper for the AHP.
+
+  command   The command to execute (e.g., 'auth', 'list_agents').
+  args      Arguments for the command, e.g. 'name=value'."""
+
+def parse_args(argv):
+    """
+    Parses `[--env local|cloud] command [args ...]` into (env, command, args).
+    argparse is not used here; this script is meant for quick shell one-liners.
+    """
+    env = "local"
+    rest = list(argv)
+    while rest and rest[0].startswith("-"):
+        option = rest.pop(0)
+        if option in ("-h", "--help"):
+            print(USAGE)
+            sys.exit(0)
+        elif option.startswith("--env="):
+            env = option[len("--env="):]
+        elif option == "--env" and rest:
+            env = rest.pop(0)
+        else:
+            print(USAGE, file=sys.stderr)
+            sys.exit(f"error: unrecognized argument: {option}")
+
+    if env not in URL_MAP:
+        print(USAGE, file=sys.stderr)
+        sys.exit(f"error: invalid --env {env!r} (choose from {', '.join(URL_MAP)})")
+    if not rest:
+        print(USAGE, file=sys.stderr)
+        sys.exit("error: the following arguments are required: command")
+    return env, rest[0], rest[1:]
+
 def main():
     """
     A Python wrapper for curl to interact with an AHP server.
     Handles authentication and token management automatically.
     """
-    parser = argparse.ArgumentParser(description="A curl wrapper for the AHP.")
-    parser.add_argument("command", help="The command to execute (e.g., 'auth', 'list_agents').")
-    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the command.")
-    parser.add_argument("--env", default="local", choices=["local", "cloud"], help="The environment to target.")
-    
-    args = parser.parse_args()
-    
-    base_url = URL_MAP[args.env]
-    command = args.command
+    env, command, command_args = parse_args(sys.argv[1:])
+    base_url = URL_MAP[env]
     
     if command == "auth":
-        if not args.args:
+        if not command_args:
             print("Usage: python ahp_curl.py auth <pre_shared_key>")
             sys.exit(1)
-        pre_shared_key = args.args[0]
+        pre_shared_key = command_args[0]
         
         print(f"Authenticating with {base_url}...")
         auth_url = f"{base_url}/auth?token={pre_shared_key}"
         try:
-            response = requests.get(auth_url)
+            response = session.get(auth_url)
             response.raise_for_status()
             auth_data = response.json()
             bearer_token = auth_data.get("bearer_token")
@@ -78,7 +103,7 @@ def main():
 
             print("Starting new session...")
             session_url = f"{base_url}/session/start?bearer_token={bearer_token}"
-            session_response = requests.get(session_url)
+            session_response = session.get(session_url)
             session_response.raise_for_status()
             session_data = session_response.json()
             session_id = session_data.get("session_id")
@@ -97,11 +122,18 @@ def main():
         session_id = load_session()
         
         url = f"{base_url}/{tool_name}?bearer_token={bearer_token}&session_id={session_id}"
-        if args.args:
-            url += "&" + "&".join(args.args)
+        if command_args:
+            url += "&" + "&".join(command_args)
             
-        print(f"Executing: curl {url}")
-        subprocess.run(["curl", url])
+        print(f"Executing: GET {url}")
+        try:
+            with session.get(url, stream=True) as response:
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, sys.stdout.buffer)
+                sys.stdout.buffer.flush()
+        except requests.exceptions.RequestException as e:
+            print(f"Error during request: {e}")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,113 +1,81 @@
-import requests
-import json
-import urllib.parse
 import argparse
-from pathlib import Path
+import asyncio
+import requests
+
+from ahp_client import AsyncAHPClient, get_client, URL_MAP, dumps_pretty
 
-# --- Configuration ---
-URL_MAP = {
-    "local": "http://localhost:8080",
-    "cloud": "https://ahp.nuts.services"
+MEMORIES = {
+    "favorite_color": "blue",
+    "favorite_food": "pizza",
+    "lucky_number": "7"
 }
-TOKEN_FILE = Path.home() / ".ahp_token"
-SESSION_FILE = Path.home() / ".ahp_session"
 
-class AHPClient:
-    """
-    A client for interacting with an AI Hypercall Protocol (AHP) server.
-    Handles authentication and session management automatically.
-    """
-    def __init__(self, base_url: str, token: str):
-        self.base_url = base_url
-        self.token = token
-        self.bearer_token = None
-        self.session_id = None
-        self._authenticate_and_start_session()
+async def run_memories_flow(base_url: str, token: str):
+    """Saves several memories concurrently, then lists the session's files to verify them."""
+    # Only this flow uses httpx, so the synchronous network flow never loads it.
+    # Its errors are re-raised as ConnectionError for the shared handler below.
+    import httpx
+    try:
+        await _save_and_verify_memories(base_url, token)
+    except httpx.HTTPError as e:
+        raise ConnectionError(str(e)) from e
+
+async def _save_and_verify_memories(base_url: str, token: str):
+    async with AsyncAHPClient(base_url, token) as client:
+        # 1. The saves are independent, so they share one round trip instead of one each.
+        print(f"\n--- Saving {len(MEMORIES)} memories ---")
+        tasks = [asyncio.create_task(client.call_tool("save_memory", name=name, data=data)) for name, data in MEMORIES.items()]
+        save_results = await asyncio.gather(*tasks)
+        print(dumps_pretty(save_results))
 
-    def _get_json_or_raise(self, response, step_name):
-        """Helper to decode JSON or raise a detailed exception."""
-        try:
-            response.raise_for_status()
-            if response.status_code == 204:
-                return {"success": True, "message": "Operation successful with no content."}
-            return response.json()
-        except json.JSONDecodeError:
-            print(f"Error: Failed to decode JSON from {step_name}.")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response Text: {response.text}")
-            raise
-        except requests.exceptions.HTTPError as e:
-            print(f"Error: HTTP error during {step_name}.")
-            print(f"Status Code: {e.response.status_code}")
-            print(f"Response Text: {e.response.text}")
-            raise
+        # 2. Verification
+        list_result = await client.call_tool("file_manager", action="list")
+        print(dumps_pretty(list_result))
+        listing = str(list_result)
+        missing = [name for name in MEMORIES if f"{name}.json" not in listing]
+        if missing:
+            print(f"\nFAILURE: Memories not found in session: {missing}")
+        else:
+            print(f"\nSUCCESS: All {len(MEMORIES)} memories were saved.")
+
+def run_network_flow(base_url: str, token: str):
+    """Checks that the server can reach the Ollama host."""
+    # 1. Initialize the client
+    client = get_client(base_url, token)
 
-    def _authenticate_and_start_session(self):
-        """Gets a bearer token and starts a new session."""
-        print("Authenticating...")
-        auth_url = f"{self.base_url}/auth?token={self.token}"
-        auth_response = requests.get(auth_url)
-        auth_data = self._get_json_or_raise(auth_response, "authentication")
-        self.bearer_token = auth_data.get("bearer_token")
-        if not self.bearer_token:
-            raise ValueError("Failed to get bearer token.")
-        print("Authentication successful.")
+    # 2. Test the network connection to the Ollama server
+    host = "ollama.nuts.services"
+    port = 11434
+    print(f"\n--- Testing network connectivity to {host}:{port} ---")
+    network_result = client.call_tool(
+        "network_test",
+        host=host,
+        port=port
+    )
+    print(dumps_pretty(network_result))
 
-        print("Starting session...")
-        session_url = f"{self.base_url}/session/start?bearer_token={self.bearer_token}"
-        session_response = requests.get(session_url)
-        session_data = self._get_json_or_raise(session_response, "session start")
-        self.session_id = session_data.get("session_id")
-        if not self.session_id:
-            raise ValueError("Failed to start session.")
-        print(f"Session started successfully: {self.session_id}")
+    # 3. Verification
+    if network_result.get("result", {}).get("success"):
+        print(f"\nSUCCESS: The server can successfully connect to {host}:{port}.")
+    else:
+        print(f"\nFAILURE: The server cannot connect to {host}:{port}.")
+        print(f"Error details: {network_result.get('result', {}).get('details')}")
 
-    def call_tool(self, tool_name: str, **params) -> dict:
-        """Calls a tool on the AHP server."""
-        if not self.bearer_token or not self.session_id:
-            raise ConnectionError("Client is not authenticated or session is not started.")
-        
-        print(f"\nCalling tool '{tool_name}' with params: {params}")
-        tool_url = f"{self.base_url}/{tool_name}"
-        
-        all_params = {
-            "bearer_token": self.bearer_token,
-            "session_id": self.session_id,
-            **params
-        }
-        
-        full_url = f"{tool_url}?{urllib.parse.urlencode(all_params)}"
-        
-        response = requests.get(full_url)
-        return self._get_json_or_raise(response, f"tool call to '{tool_name}'")
+_PARSER = argparse.ArgumentParser(description="A client for the AHP server.")
+_PARSER.add_argument("--env", default="local", choices=["local", "cloud"], help="The environment to target.")
+_PARSER.add_argument("--flow", default="network", choices=["network", "memories"], help="The test flow to run.")
 
 # --- Main Test Flow ---
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="A client for the AHP server.")
-    parser.add_argument("--env", default="local", choices=["local", "cloud"], help="The environment to target.")
-    args = parser.parse_args()
+    args = _PARSER.parse_args()
 
-    try:
-        # 1. Initialize the client
-        client = AHPClient(base_url=URL_MAP[args.env], token="linkedinPROMO1" if args.env == "cloud" else "f00bar")
+    base_url = URL_MAP[args.env]
+    token = "linkedinPROMO1" if args.env == "cloud" else "f00bar"
 
-        # 2. Test the network connection to the Ollama server
-        host = "ollama.nuts.services"
-        port = 11434
-        print(f"\n--- Testing network connectivity to {host}:{port} ---")
-        network_result = client.call_tool(
-            "network_test",
-            host=host,
-            port=port
-        )
-        print(json.dumps(network_result, indent=2))
-        
-        # 3. Verification
-        if network_result.get("result", {}).get("success"):
-            print(f"\nSUCCESS: The server can successfully connect to {host}:{port}.")
+    try:
+        if args.flow == "memories":
+            asyncio.run(run_memories_flow(base_url, token))
         else:
-            print(f"\nFAILURE: The server cannot connect to {host}:{port}.")
-            print(f"Error details: {network_result.get('result', {}).get('details')}")
-
+            run_network_flow(base_url, token)
     except (ValueError, ConnectionError, requests.exceptions.RequestException, AssertionError) as e:
         print(f"\nAn error occurred during the test: {e}")
@@ -3,30 +3,147 @@ Gnosis AHP Deployment Script (Python)
 Builds and deploys the AHP service for local (Docker Compose) or Cloud Run.
 """
 import os
+import json
 import subprocess
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import dotenv_values
 
-def run_command(command, cwd=None):
-    """Runs a command and checks for errors."""
+def run_command(command, cwd=None, echo=True, env=None):
+    """
+    Runs a command and checks for errors, returning the CompletedProcess.
+    With echo=True output is streamed line by line as it is produced.
+    With echo=False it is captured and left for the caller to print via print_output().
+    """
+    if not echo:
+        try:
+            return subprocess.run(
+                command, 
+                check=True, 
+                capture_output=True, 
+                text=True, 
+                cwd=cwd,
+                env=env
+            )
+        except subprocess.CalledProcessError as e:
+            print(f"Error executing command: {' '.join(command)}", file=sys.stderr)
+            print(e.stdout, file=sys.stdout)
+            print(e.stderr, file=sys.stderr)
+            sys.exit(1)
+
     print(f"Running: {' '.join(command)}", flush=True)
-    try:
-        process = subprocess.run(
-            command, 
-            check=True, 
-            capture_output=True, 
-            text=True, 
-            cwd=cwd
-        )
-        print(process.stdout)
-        if process.stderr:
-            print(process.stderr, file=sys.stderr)
-    except subprocess.CalledProcessError as e:
+    with subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=1,
+        text=True,
+        cwd=cwd,
+        env=env
+    ) as process:
+        for line in process.stdout:
+            sys.stdout.write(line)
+        returncode = process.wait()
+    sys.stdout.flush()
+    if returncode != 0:
         print(f"Error executing command: {' '.join(command)}", file=sys.stderr)
-        print(e.stdout, file=sys.stdout)
-        print(e.stderr, file=sys.stderr)
         sys.exit(1)
+    return subprocess.CompletedProcess(command, returncode)
+
+def print_output(process):
+    """Prints the captured stdout/stderr of a finished command."""
+    print(process.stdout)
+    if process.stderr:
+        print(process.stderr, file=sys.stderr)
+
+REGISTRIES = ["artifact", "gcr"]
+
+def build_image(full_image_name, dockerfile, rebuild=False, cache_from=None):
+    """
+    Builds the service image from the project's Dockerfile with BuildKit.
+    The image embeds inline cache metadata; `cache_from` names a previously pushed image
+    whose layers are pulled instead of rebuilt when unchanged.
+    """
+    print("\n=== Building Docker Image ===")
+    build_command = ["docker", "build", "-f", dockerfile, "-t", full_image_name, "--build-arg", "BUILDKIT_INLINE_CACHE=1"]
+    if rebuild:
+        build_command.append("--no-cache")
+    elif cache_from:
+        build_command.extend(["--cache-from", cache_from])
+    build_command.append(".")
+
+    run_command(build_command, env={**os.environ, "DOCKER_BUILDKIT": "1"})
+    print("✓ Build completed successfully")
+
+def deploy_local(compose_file):
+    """Restarts the service locally with Docker Compose."""
+    print("Deploying locally with Docker Compose...")
+    # A single `up` recreates only changed services in place; no separate `down` is needed.
+    run_command(["docker", "compose", "-f", compose_file, "up", "-d", "--build", "--remove-orphans"])
+    print("✓ Service started successfully. Available at http://localhost:8080")
+
+def registry_image(registry, env_config, image_name, tag):
+    """Returns (registry host, full remote image path) for the chosen registry."""
+    project_id = env_config.get("PROJECT_ID")
+    if registry == "gcr":
+        return "gcr.io", f"gcr.io/{project_id}/{image_name}:{tag}"
+    region = env_config.get("REGION")
+    repo_name = env_config.get("ARTIFACT_REGISTRY_REPO")
+    host = f"{region}-docker.pkg.dev"
+    return host, f"{host}/{project_id}/{repo_name}/{image_name}:{tag}"
+
+def docker_auth_configured(registry_host):
+    """
+    True if Docker already routes `registry_host` through the gcloud credential helper,
+    i.e. `gcloud auth configure-docker` has been run before and would be a no-op.
+    """
+    config_dir = os.environ.get("DOCKER_CONFIG") or os.path.join(os.path.expanduser("~"), ".docker")
+    try:
+        with open(os.path.join(config_dir, "config.json")) as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return config.get("credHelpers", {}).get(registry_host) == "gcloud"
+
+def push_image(full_image_name, remote_image, registry_host):
+    """Tags the local image for the registry and pushes it."""
+    # Tagging and registry auth are independent, so their CLI startup costs overlap.
+    # Output is printed in submission order once both finish, keeping the log deterministic.
+    commands = [["docker", "tag", full_image_name, remote_image]]
+    if docker_auth_configured(registry_host):
+        print(f"Docker credential helper for {registry_host} already configured; skipping gcloud auth.")
+    else:
+        commands.append(["gcloud", "auth", "configure-docker", registry_host, "--quiet"])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(run_command, command, echo=False) for command in commands]
+        for command, future in zip(commands, futures):
+            process = future.result()
+            print(f"Running: {' '.join(command)}")
+            print_output(process)
+    run_command(["docker", "push", remote_image])
+    print(f"✓ Image pushed successfully to {registry_host}.")
+
+def deploy_cloudrun(image_name, remote_image, env_config):
+    """Deploys the pushed image to Cloud Run with the server's environment variables."""
+    # Filter out keys that are not for the AHP server itself
+    deploy_env_vars = {k: v for k, v in env_config.items() if k not in ["PROJECT_ID", "GCP_SERVICE_ACCOUNT", "REGION", "ARTIFACT_REGISTRY_REPO"]}
+    env_vars_string = ",".join([f"{key}={value}" for key, value in deploy_env_vars.items()])
+
+    deploy_command = [
+        "gcloud", "run", "deploy", image_name,
+        "--image", remote_image,
+        "--region", env_config.get("REGION"),
+        "--platform", "managed",
+        "--allow-unauthenticated",
+        "--port", "8080",
+        "--service-account", env_config.get("GCP_SERVICE_ACCOUNT")
+    ]
+    if env_vars_string:
+        deploy_command.extend(["--set-env-vars", env_vars_string])
+
+    run_command(deploy_command)
+    print("✓ CLOUD RUN DEPLOYMENT SUCCESSFUL!")
 
 def main():
     parser = argparse.ArgumentParser(description="Gnosis AHP Deployment Script")
@@ -46,10 +163,15 @@ def main():
         action="store_true", 
         help="Force a rebuild of the Docker image without cache"
     )
+    parser.add_argument(
+        "--registry",
+        choices=REGISTRIES,
+        default="artifact",
+        help="Image registry for Cloud Run: 'artifact' (Artifact Registry) or 'gcr' (gcr.io)"
+    )
     args = parser.parse_args()
 
     # --- Project Configuration ---
-    project_root = os.path.dirname(os.path.abspath(__file__))
     image_name = "gnosis-ahp"
     full_image_name = f"{image_name}:{args.tag}"
     dockerfile = "Dockerfile"
@@ -58,64 +180,34 @@ def main():
     print("=== Gnosis AHP Deployment ===")
     print(f"Target: {args.target}, Image: {full_image_name}")
 
+    # --- Cloud Run Configuration ---
+    # Resolved before building: a missing setting fails fast, and the previously
+    # pushed image seeds the build cache.
+    remote_image = None
+    if args.target == "cloudrun":
+        env_config = dotenv_values(".env.cloudrun")
+
+        required = ["PROJECT_ID", "GCP_SERVICE_ACCOUNT", "REGION"]
+        if args.registry == "artifact":
+            required.append("ARTIFACT_REGISTRY_REPO")
+        if not all(env_config.get(key) for key in required):
+            print(f"Error: .env.cloudrun must contain {', '.join(required)}.", file=sys.stderr)
+            sys.exit(1)
+
+        registry_host, remote_image = registry_image(args.registry, env_config, image_name, args.tag)
+
     # --- Build Docker Image ---
-    print("\n=== Building Docker Image ===")
-    build_command = ["docker", "build", "-f", dockerfile, "-t", full_image_name, "."]
-    if args.rebuild:
-        build_command.append("--no-cache")
-    
-    run_command(build_command)
-    print("✓ Build completed successfully")
+    build_image(full_image_name, dockerfile, rebuild=args.rebuild, cache_from=remote_image)
 
     # --- Deployment ---
     print(f"\n=== Deploying to {args.target} ===")
     if args.target == "local":
-        print("Deploying locally with Docker Compose...")
-        run_command(["docker-compose", "-f", compose_file, "down"])
-        run_command(["docker-compose", "-f", compose_file, "up", "-d", "--build"])
-        print("✓ Service started successfully. Available at http://localhost:8080")
+        deploy_local(compose_file)
 
     elif args.target == "cloudrun":
-        print("Deploying to Google Cloud Run via Artifact Registry...")
-        env_config = dotenv_values(".env.cloudrun")
-        
-        project_id = env_config.get("PROJECT_ID")
-        service_account = env_config.get("GCP_SERVICE_ACCOUNT")
-        region = env_config.get("REGION")
-        repo_name = env_config.get("ARTIFACT_REGISTRY_REPO")
-
-        if not all([project_id, service_account, region, repo_name]):
-            print("Error: .env.cloudrun must contain PROJECT_ID, GCP_SERVICE_ACCOUNT, REGION, and ARTIFACT_REGISTRY_REPO.", file=sys.stderr)
-            sys.exit(1)
-
-        # Construct the full image path for Artifact Registry
-        ar_image = f"{region}-docker.pkg.dev/{project_id}/{repo_name}/{image_name}:{args.tag}"
-
-        # Tag and Push Image to Artifact Registry
-        run_command(["docker", "tag", full_image_name, ar_image])
-        run_command(["gcloud", "auth", "configure-docker", f"{region}-docker.pkg.dev", "--quiet"])
-        run_command(["docker", "push", ar_image])
-        print("✓ Image pushed successfully to Artifact Registry.")
-
-        # Deploy to Cloud Run
-        # Filter out keys that are not for the AHP server itself
-        deploy_env_vars = {k: v for k, v in env_config.items() if k not in ["PROJECT_ID", "GCP_SERVICE_ACCOUNT", "REGION", "ARTIFACT_REGISTRY_REPO"]}
-        env_vars_string = ",".join([f"{key}={value}" for key, value in deploy_env_vars.items()])
-        
-        deploy_command = [
-            "gcloud", "run", "deploy", image_name,
-            "--image", ar_image,
-            "--region", region,
-            "--platform", "managed",
-            "--allow-unauthenticated",
-            "--port", "8080",
-            "--service-account", service_account
-        ]
-        if env_vars_string:
-            deploy_command.extend(["--set-env-vars", env_vars_string])
-
-        run_command(deploy_command)
-        print("✓ CLOUD RUN DEPLOYMENT SUCCESSFUL!")
+        print(f"Deploying to Google Cloud Run via {'gcr.io' if args.registry == 'gcr' else 'Artifact Registry'}...")
+        push_image(full_image_name, remote_image, registry_host)
+        deploy_cloudrun(image_name, remote_image, env_config)
 
     print("\n=== Deployment Complete ===")
 
@@ -3,13 +3,16 @@ Stateless, signed token authentication using HMAC.
 This avoids the need for a shared token store in a multi-worker environment.
 """
 import os
+import functools
 import hmac
 import hashlib
 import base64
 import json
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Dict
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
 
 from gnosis_ahp.core.errors import invalid_bearer_token_exception
 
@@ -19,6 +22,25 @@ logger = logging.getLogger(__name__)
 # --- Configuration ---
 TOKEN_LIFESPAN_MINUTES = int(os.getenv("TOKEN_LIFESPAN_MINUTES", 60))
 
+# Agent IDs made only of these characters need no JSON escaping, so their payload can be formatted directly.
+_PLAIN_AGENT_ID = re.compile(r"[\w.@+-]*", re.ASCII)
+
+# --- Verified Token Cache ---
+# Maps (secret_key, token) -> (agent_id, exp) for tokens whose signature has already been checked,
+# so an agent presenting the same token repeatedly skips the base64 decoding and HMAC.
+# Keying on the secret too means a rotated key never accepts tokens verified under the old one.
+_token_cache: "OrderedDict[Tuple[str, str], Tuple[str, int]]" = OrderedDict()
+_TOKEN_CACHE_MAX = 4096
+_TOKEN_CACHE_LOW_WATERMARK = _TOKEN_CACHE_MAX - _TOKEN_CACHE_MAX // 8
+
+@functools.lru_cache(maxsize=4)
+def _hmac_template(secret_key: str) -> hmac.HMAC:
+    """
+    Returns an HMAC-SHA256 object keyed with `secret_key` and fed no data.
+    Callers .copy() it, so the key schedule runs once per key rather than once per token.
+    """
+    return hmac.new(secret_key.encode('utf-8'), b'', hashlib.sha256)
+
 def generate_token(agent_id: str, secret_key: str) -> str:
     """
     Generates a secure, stateless, signed token using a provided secret key.
@@ -26,86 +48,104 @@ def generate_token(agent_id: str, secret_key: str) -> str:
     if not secret_key:
         raise ValueError("Secret key cannot be empty for token generation.")
 
-    expiration_time = datetime.now(timezone.utc) + timedelta(minutes=TOKEN_LIFESPAN_MINUTES)
-    payload = {
-        "agent_id": agent_id,
-        "exp": expiration_time.isoformat()
-    }
-    payload_bytes = json.dumps(payload, separators=(",", ":")).encode('utf-8')
+    # Expiration is a unix-epoch int so validation is a plain comparison against time.time().
+    exp = int(time.time()) + TOKEN_LIFESPAN_MINUTES * 60
+    if _PLAIN_AGENT_ID.fullmatch(agent_id):
+        # Byte-for-byte what json.dumps(..., separators=(",", ":")) produces for this payload.
+        payload_bytes = b'{"agent_id":"%s","exp":%d}' % (agent_id.encode('ascii'), exp)
+    else:
+        payload = {
+            "agent_id": agent_id,
+            "exp": exp
+        }
+        payload_bytes = json.dumps(payload, separators=(",", ":")).encode('utf-8')
     encoded_payload = base64.urlsafe_b64encode(payload_bytes).rstrip(b'=').decode('utf-8')
 
-    signature_generator = hmac.new(secret_key.encode('utf-8'), encoded_payload.encode('utf-8'), hashlib.sha256)
+    signature_generator = _hmac_template(secret_key).copy()
+    signature_generator.update(encoded_payload.encode('utf-8'))
     signature = signature_generator.digest()
     encoded_signature = base64.urlsafe_b64encode(signature).rstrip(b'=').decode('utf-8')
 
     return f"{encoded_payload}.{encoded_signature}"
 
+def _evict_cached_tokens():
+    """
+    Brings the verified token cache back under its limit once it overflows.
+    Expired tokens are swept first, in one pass, so they never push out live ones;
+    then least recently used entries are dropped down to the low watermark, so the
+    sweep runs once per several hundred inserts rather than on every one.
+    """
+    now = time.time()
+    expired = [key for key, (_, exp) in _token_cache.items() if exp < now]
+    for key in expired:
+        del _token_cache[key]
+    while len(_token_cache) > _TOKEN_CACHE_LOW_WATERMARK:
+        _token_cache.popitem(last=False)
+
 def validate_token_from_query(token: str, secret_key: str) -> Dict:
     """
     Validates a stateless bearer token from a query parameter using a provided secret key.
     """
-    logger.info("--- Starting Token Validation ---")
-    
     if not secret_key:
         logger.error("Validation failed: Secret key is missing.")
         raise ValueError("Secret key cannot be empty for token validation.")
     
-    # Log a masked version of the secret key for security
-    masked_key = secret_key[:8] + "..." if len(secret_key) > 8 else secret_key
-    logger.info(f"Using secret key starting with: '{masked_key}'")
-
     if not token:
         logger.warning("Validation failed: Missing bearer_token.")
         raise invalid_bearer_token_exception("Missing bearer_token.")
 
-    logger.info(f"Received token: {token}")
+    cache_key = (secret_key, token)
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        agent_id, exp = cached
+        if exp >= time.time():
+            _token_cache.move_to_end(cache_key)
+            return {"agent_id": agent_id}
+        del _token_cache[cache_key]
+        raise invalid_bearer_token_exception("Bearer token has expired.")
+
+    # Only a masked prefix of the token is ever logged.
+    logger.debug("Validating token '%s...'", token[:8])
     parts = token.split('.')
     if len(parts) != 2:
-        logger.warning(f"Validation failed: Invalid token format. Expected 2 parts, got {len(parts)}.")
+        logger.warning("Validation failed: Invalid token format. Expected 2 parts, got %d.", len(parts))
         raise invalid_bearer_token_exception("Invalid token format.")
     
     encoded_payload, encoded_signature = parts
-    logger.info(f"Encoded Payload: {encoded_payload}")
-    logger.info(f"Encoded Signature: {encoded_signature}")
 
     # Verify the signature
     try:
-        expected_signature_generator = hmac.new(secret_key.encode('utf-8'), encoded_payload.encode('utf-8'), hashlib.sha256)
+        expected_signature_generator = _hmac_template(secret_key).copy()
+        expected_signature_generator.update(encoded_payload.encode('utf-8'))
         expected_signature = expected_signature_generator.digest()
-        
-        provided_signature = base64.urlsafe_b64decode(encoded_signature + '==')
-        
-        is_valid_signature = hmac.compare_digest(expected_signature, provided_signature)
-        logger.info(f"Signature comparison result: {'Success' if is_valid_signature else 'Failure'}")
 
+        # Compare in the unpadded encoded form the token carries, so the provided signature is never decoded.
+        expected_encoded = base64.urlsafe_b64encode(expected_signature).rstrip(b'=').decode('ascii')
+        is_valid_signature = hmac.compare_digest(expected_encoded, encoded_signature)
         if not is_valid_signature:
+            logger.warning("Validation failed: Invalid token signature.")
             raise invalid_bearer_token_exception("Invalid token signature.")
             
     except (TypeError, base64.binascii.Error) as e:
-        logger.error(f"Validation failed: Error decoding signature. Details: {e}")
+        logger.error("Validation failed: Error decoding signature. Details: %s", e)
         raise invalid_bearer_token_exception("Invalid signature encoding.")
 
     # Decode the payload and check for expiration
     try:
-        payload_bytes = base64.urlsafe_b64decode(encoded_payload + '==')
-        payload = json.loads(payload_bytes.decode('utf-8'))
-        logger.info(f"Decoded Payload: {payload}")
-        
-        expiration_time = datetime.fromisoformat(payload["exp"])
-        current_time = datetime.now(timezone.utc)
-        
-        logger.info(f"Token expiration time: {expiration_time.isoformat()}")
-        logger.info(f"Current UTC time:      {current_time.isoformat()}")
-        
-        is_expired = expiration_time < current_time
-        logger.info(f"Expiration check result: {'Expired' if is_expired else 'Not Expired'}")
+        payload_bytes = base64.urlsafe_b64decode(encoded_payload + '=' * (-len(encoded_payload) % 4))
+        payload = json.loads(payload_bytes)
+        logger.debug("Decoded Payload: %s", payload)
 
-        if is_expired:
+        if payload["exp"] < time.time():
+            logger.info("Validation failed: Bearer token has expired.")
             raise invalid_bearer_token_exception("Bearer token has expired.")
             
     except (TypeError, base64.binascii.Error, json.JSONDecodeError, KeyError, ValueError) as e:
-        logger.error(f"Validation failed: Error decoding or parsing payload. Details: {e}")
+        logger.error("Validation failed: Error decoding or parsing payload. Details: %s", e)
         raise invalid_bearer_token_exception("Invalid payload.")
         
-    logger.info("--- Token Validation Successful ---")
+    logger.info("Token validated for agent '%s'.", payload["agent_id"])
+    _token_cache[cache_key] = (payload["agent_id"], payload["exp"])
+    if len(_token_cache) > _TOKEN_CACHE_MAX:
+        _evict_cached_tokens()
     return {"agent_id": payload["agent_id"]}
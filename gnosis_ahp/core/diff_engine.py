@@ -2,126 +2,326 @@
 Core engine for file diffing, patching, and versioning, using StorageService.
 """
 import re
+import asyncio
 import difflib
+import functools
 import time
-from typing import Dict, Any, List
+from collections import Counter, namedtuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from gnosis_ahp.core.storage_service import StorageService
 
-async def get_file_versions(storage: StorageService, file_path: str, session_id: str) -> List[Dict[str, Any]]:
-    """Gets information about all versions of a file from the storage service."""
+# --- Patterns ---
+# Anchored per line so one finditer can scan a newline-joined listing of names.
+_VERSION_RE = re.compile(r"^v(\d+)_(\d+)(\..*)?\.backup", re.MULTILINE)
+_TAG_SANITIZE_RE = re.compile(r'[^\w\-_]')
+# ASCII equivalent of _TAG_SANITIZE_RE for str.translate: everything but [A-Za-z0-9_-] becomes '_'.
+_SAFE_TAG_TABLE = {i: '_' for i in range(128) if not (chr(i).isalnum() or chr(i) in '-_')}
+
+@functools.lru_cache(maxsize=128)
+def _safe_tag(tag: str) -> str:
+    """Sanitizes a change tag for use in a backup filename; tags repeat heavily, so memoize."""
+    if tag.isascii():
+        return tag.translate(_SAFE_TAG_TABLE)
+    # \w is Unicode-aware, so non-ASCII tags keep the regex
+    return _TAG_SANITIZE_RE.sub('_', tag)
+
+# A backed-up version as seen by the engine; dates are only rendered for the versions listing.
+VersionInfo = namedtuple('VersionInfo', 'version timestamp path tag')
+
+async def _list_version_files(storage: StorageService, versions_dir: str, session_id: str) -> List[Dict[str, Any]]:
+    """Lists the raw entries of a versions directory, or [] if it doesn't exist yet."""
+    try:
+        return await storage.list_files(prefix=versions_dir, session_hash=session_id)
+    except FileNotFoundError:
+        return []
+
+def _match_version_names(names: List[str]):
+    """
+    Yields (name, match) for each backup filename in `names`. The names are joined and
+    scanned with a single finditer, so the regex engine rather than a Python loop walks them.
+    """
+    name_at = {}
+    offset = 0
+    for name in names:
+        name_at[offset] = name
+        offset += len(name) + 1
+    for match in _VERSION_RE.finditer('\n'.join(names)):
+        # Only matches at the start of a name count, as with re.match on each name.
+        name = name_at.get(match.start())
+        if name is not None:
+            yield name, match
+
+def _max_version_number(names: List[str]) -> int:
+    """Returns the highest version number among backup filenames, or 0 if there are none."""
+    return max((int(match.group(1)) for _, match in _match_version_names(names)), default=0)
+
+async def _list_past_versions(storage: StorageService, file_path: str, session_id: str) -> List[VersionInfo]:
+    """Lists a file's backed-up versions, newest first, with one storage listing."""
     versions = []
     # Versions are stored relative to the session's root
     versions_dir = f".{file_path}_versions"
+    version_files = await _list_version_files(storage, versions_dir, session_id)
+
+    for name, match in _match_version_names([f['name'] for f in version_files]):
+        versions.append(VersionInfo(
+            int(match.group(1)),
+            int(match.group(2)),
+            f"{versions_dir}/{name}",
+            match.group(3)[1:] if match.group(3) else None
+        ))
     
-    try:
-        version_files = await storage.list_files(prefix=versions_dir, session_hash=session_id)
-    except FileNotFoundError:
-        version_files = []
-
-    for version_file in version_files:
-        match = re.match(r"v(\d+)_(\d+)(\..*)?\.backup", version_file['name'])
-        if match:
-            version_number = int(match.group(1))
-            timestamp = int(match.group(2))
-            tag = match.group(3)[1:] if match.group(3) else None
-            versions.append({
-                "version": version_number,
-                "timestamp": timestamp,
-                "date": datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S"),
-                "path": f"{versions_dir}/{version_file['name']}",
-                "tag": tag
-            })
+    versions.sort(reverse=True)
+    return versions
+
+def _next_version_number(past_versions: List[VersionInfo]) -> int:
+    """Returns the version number after the highest one in `past_versions`."""
+    if not past_versions:
+        return 1
+    return past_versions[0].version + 1
+
+async def get_file_versions(storage: StorageService, file_path: str, session_id: str) -> List[Dict[str, Any]]:
+    """Gets information about all versions of a file from the storage service."""
+    # The "current" entry only needs an existence check, not a download of the file.
+    past_versions, current_exists = await asyncio.gather(
+        _list_past_versions(storage, file_path, session_id),
+        storage.file_exists(file_path, session_hash=session_id)
+    )
     
-    versions.sort(key=lambda x: x["version"], reverse=True)
+    versions = [{
+        "version": v.version,
+        "timestamp": v.timestamp,
+        "date": datetime.fromtimestamp(v.timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+        "path": v.path,
+        "tag": v.tag
+    } for v in past_versions]
     
-    try:
-        await storage.get_file(file_path, session_hash=session_id)
+    if current_exists:
         versions.insert(0, {"version": "current", "path": file_path})
-    except FileNotFoundError:
-        pass
 
     return versions
 
 async def get_next_version_number(storage: StorageService, file_path: str, session_id: str) -> int:
     """Gets the next version number for a file."""
-    versions = await get_file_versions(storage, file_path, session_id)
-    past_versions = [v for v in versions if v["version"] != "current"]
-    if not past_versions:
-        return 1
-    return max(v["version"] for v in past_versions) + 1
+    # Only the maximum matters here; skip the per-version dicts, dates and sort.
+    version_files = await _list_version_files(storage, f".{file_path}_versions", session_id)
+    return _max_version_number([f['name'] for f in version_files]) + 1
 
-async def create_file_backup(storage: StorageService, file_path: str, session_id: str, change_tag: str = None) -> Dict[str, Any]:
-    """Creates a backup of the file in a versioned directory using the storage service."""
+async def create_file_backup(
+    storage: StorageService,
+    file_path: str,
+    session_id: str,
+    change_tag: str = None,
+    content: bytes = None,
+    version_number: int = None
+) -> Dict[str, Any]:
+    """
+    Creates a backup of the file in a versioned directory using the storage service.
+    Callers that have already read the file or listed its versions can pass `content`
+    and `version_number` to skip those storage calls; without `content` the backup is
+    a storage-side copy and the bytes are never loaded.
+    """
     versions_dir = f".{file_path}_versions"
-    version_number = await get_next_version_number(storage, file_path, session_id)
+    if version_number is None:
+        version_number = await get_next_version_number(storage, file_path, session_id)
     timestamp = int(time.time())
     
     if change_tag:
-        safe_tag = re.sub(r'[^\w\-_]', '_', change_tag)
-        tag_suffix = f".{safe_tag}"
+        tag_suffix = f".{_safe_tag(change_tag)}"
     else:
         tag_suffix = ""
     
     backup_filename = f"v{version_number}_{timestamp}{tag_suffix}.backup"
     
-    try:
-        content = await storage.get_file(file_path, session_hash=session_id)
-        await storage.save_file(content, f"{versions_dir}/{backup_filename}", session_hash=session_id)
-        return {"version": version_number, "change_tag": change_tag}
-    except FileNotFoundError:
-        return None
+    backup_path = f"{versions_dir}/{backup_filename}"
+    if content is None:
+        try:
+            await storage.copy_file(file_path, backup_path, session_hash=session_id)
+        except FileNotFoundError:
+            return None
+    else:
+        await storage.save_file(content, backup_path, session_hash=session_id)
+    return {"version": version_number, "change_tag": change_tag}
 
 async def restore_file_version(storage: StorageService, file_path: str, session_id: str, version_number: int) -> Dict[str, Any]:
     """Restores a specific version of a file."""
-    versions = await get_file_versions(storage, file_path, session_id)
-    target_version = next((v for v in versions if v["version"] == version_number), None)
+    # One listing serves both the lookup and the pre-restore backup's version number.
+    past_versions = await _list_past_versions(storage, file_path, session_id)
+    target_version = next((v for v in past_versions if v.version == version_number), None)
     
     if not target_version:
         raise ValueError(f"Version {version_number} not found for {file_path}")
     
-    await create_file_backup(storage, file_path, session_id, "pre_restore")
+    await create_file_backup(
+        storage, file_path, session_id, "pre_restore",
+        version_number=_next_version_number(past_versions)
+    )
     
-    version_content = await storage.get_file(target_version["path"], session_hash=session_id)
+    version_content = await storage.get_file(target_version.path, session_hash=session_id)
     await storage.save_file(version_content, file_path, session_hash=session_id)
     
     return {"success": True, "restored_version": version_number}
 
+# --- Diff Markers ---
+SEARCH_MARKER = "<<<<<<< SEARCH\n"
+DIVIDER_MARKER = "\n=======\n"
+REPLACE_MARKER = "\n>>>>>>> REPLACE"
+
+def parse_search_replace(diff_text: str) -> Optional[Tuple[str, str]]:
+    """
+    Extracts (search_block, replace_block) from the first SEARCH/REPLACE block in `diff_text`,
+    or returns None if the markers are missing. Three linear str.find scans; no regex backtracking.
+    """
+    start = diff_text.find(SEARCH_MARKER)
+    if start == -1:
+        return None
+    start += len(SEARCH_MARKER)
+    divider = diff_text.find(DIVIDER_MARKER, start)
+    if divider == -1:
+        return None
+    replace_start = divider + len(DIVIDER_MARKER)
+    end = diff_text.find(REPLACE_MARKER, replace_start)
+    if end == -1:
+        return None
+    return diff_text[start:divider], diff_text[replace_start:end]
+
+# A window must score above this SequenceMatcher ratio to count as a match.
+FUZZY_MATCH_THRESHOLD = 0.7
+
+def _exact_lines_offset(needle, content) -> int:
+    """
+    Returns the offset of the first occurrence of `needle` in `content` that starts and ends on
+    line boundaries, or -1. Works on str or on UTF-8 bytes (a newline byte never occurs inside a multi-byte character).
+    """
+    newline = b'\n' if isinstance(content, bytes) else '\n'
+    pos = content.find(needle)
+    while pos != -1:
+        end = pos + len(needle)
+        if (pos == 0 or content[pos - 1:pos] == newline) and (end == len(content) or content[end:end + 1] == newline):
+            return pos
+        pos = content.find(needle, pos + 1)
+    return -1
+
+def _line_span(content_lines: List[str], first: int, last: int) -> Tuple[int, int]:
+    """Returns the (start, end) string offsets of content_lines[first:last] within the joined content."""
+    start = sum(len(line) + 1 for line in content_lines[:first])
+    end = start + sum(len(line) + 1 for line in content_lines[first:last]) - 1
+    return start, end
+
 def find_fuzzy_match(search_text: str, content: str):
+    span = find_fuzzy_span(search_text, content)
+    return None if span is None else content[span[0]:span[1]]
+
+def find_fuzzy_span(search_text: str, content: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns the (start, end) offsets of the whole lines in `content` that best match `search_text`,
+    or None. Callers splice at these offsets, so an identical text elsewhere in the file is never edited instead.
+    """
     search_lines = [line for line in search_text.split('\n') if line]
+
+    needle = '\n'.join(search_lines)
+    if not search_lines:
+        return 0, 0
+
+    # Fast path: the SEARCH lines usually appear verbatim, which is the first window a full scan would score 1.0.
+    pos = _exact_lines_offset(needle, content)
+    if pos != -1:
+        return pos, pos + len(needle)
+
     content_lines = content.split('\n')
-    
+
+    # One matcher for the whole scan: the SEARCH lines stay as its first sequence and each window
+    # is swapped in with set_seq2. autojunk is off so long blocks aren't scored with lines discarded as "popular".
+    matcher = difflib.SequenceMatcher(None, autojunk=False)
+    matcher.set_seq1(search_lines)
+
+    # A window's ratio() can't exceed overlap / k, where overlap counts the lines it shares with
+    # the SEARCH block (as multisets) -- the same bound quick_ratio() computes. Keeping the window's
+    # line counts as it slides makes the bound O(1) per window, and only windows whose bound beats
+    # both the best so far and the threshold get the full comparison.
+    k = len(search_lines)
+    needle_counts = Counter(search_lines)
+    window_counts = Counter()
+    overlap = 0
+
     best_ratio, best_match_start, best_match_end = 0, -1, -1
-    for i in range(len(content_lines) - len(search_lines) + 1):
-        chunk = content_lines[i:i+len(search_lines)]
-        ratio = difflib.SequenceMatcher(None, search_lines, chunk).ratio()
+    for end, line in enumerate(content_lines):
+        window_counts[line] += 1
+        if window_counts[line] <= needle_counts[line]:
+            overlap += 1
+        i = end - k + 1
+        if i > 0:
+            dropped = content_lines[i - 1]
+            if window_counts[dropped] <= needle_counts[dropped]:
+                overlap -= 1
+            window_counts[dropped] -= 1
+        if i < 0 or overlap / k <= max(best_ratio, FUZZY_MATCH_THRESHOLD):
+            continue
+
+        chunk = content_lines[i:end + 1]
+        if chunk == search_lines:
+            return _line_span(content_lines, i, end + 1)
+        matcher.set_seq2(chunk)
+        ratio = matcher.ratio()
         if ratio > best_ratio:
-            best_ratio, best_match_start, best_match_end = ratio, i, i + len(search_lines)
+            best_ratio, best_match_start, best_match_end = ratio, i, i + k
 
-    return '\n'.join(content_lines[best_match_start:best_match_end]) if best_ratio > 0.7 else None
+    if best_ratio <= FUZZY_MATCH_THRESHOLD:
+        return None
+    return _line_span(content_lines, best_match_start, best_match_end)
 
 async def file_diff_write(storage: StorageService, file_path: str, session_id: str, diff_text: str, change_tag: str = None) -> Dict[str, Any]:
-    """Applies a diff to a file using the storage service."""
+    """
+    Applies a diff to a file using the storage service.
+    The file read overlaps the version listing, and the backup overlaps the write of the new content.
+    A diff that doesn't apply, or that leaves the content unchanged, writes nothing;
+    a malformed one is rejected before anything is read.
+    """
+    blocks = parse_search_replace(diff_text)
+    if blocks is None:
+        return {"success": False, "error": "Invalid diff format"}
+    search_block, replace_block = blocks
+
     try:
-        original_content = (await storage.get_file(file_path, session_hash=session_id)).decode('utf-8')
+        original_bytes, past_versions = await asyncio.gather(
+            storage.get_file(file_path, session_hash=session_id),
+            _list_past_versions(storage, file_path, session_id)
+        )
     except FileNotFoundError:
         return {"success": False, "error": f"File not found at {file_path}"}
 
-    await create_file_backup(storage, file_path, session_id, change_tag)
-    
-    match = re.search(r'<<<<<<< SEARCH\n(.*?)\n=======\n(.*?)\n>>>>>>> REPLACE', diff_text, re.DOTALL)
-    if not match:
-        return {"success": False, "error": "Invalid diff format"}
-        
-    search_block, replace_block = match.groups()
-    content_to_replace = find_fuzzy_match(search_block, original_content)
-    
-    if content_to_replace is None:
-        return {"success": False, "error": "Could not find a confident match for the SEARCH block"}
+    # Exact matches are found and replaced on the raw bytes; UTF-8 is self-synchronizing, so this is
+    # equivalent to the str path without decoding and re-encoding the whole file.
+    # Only a fuzzy match needs the decoded text.
+    # One SEARCH block is one edit: only the matched occurrence is replaced.
+    needle = '\n'.join(line for line in search_block.split('\n') if line).encode('utf-8')
+    pos = _exact_lines_offset(needle, original_bytes) if needle else -1
+    if pos != -1:
+        modified_content = original_bytes[:pos] + replace_block.encode('utf-8') + original_bytes[pos + len(needle):]
+        unchanged = modified_content == original_bytes
+    else:
+        original_content = original_bytes.decode('utf-8')
+        span = find_fuzzy_span(search_block, original_content)
+
+        if span is None:
+            return {"success": False, "error": "Could not find a confident match for the SEARCH block"}
+
+        modified_content = original_content[:span[0]] + replace_block + original_content[span[1]:]
+        unchanged = modified_content == original_content
+
+    if unchanged:
+        # No-op diff (REPLACE equals the matched text): skip both the backup and the save.
+        return {"success": True, "changes_applied": False}
 
-    modified_content = original_content.replace(content_to_replace, replace_block)
-    await storage.save_file(modified_content, file_path, session_hash=session_id)
+    await asyncio.gather(
+        create_file_backup(
+            storage, file_path, session_id, change_tag,
+            content=original_bytes,
+            version_number=_next_version_number(past_versions)
+        ),
+        storage.save_file(modified_content, file_path, session_hash=session_id)
+    )
     
     return {"success": True, "changes_applied": True}
 
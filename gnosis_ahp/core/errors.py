@@ -4,6 +4,12 @@ from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Optional
 
+def _make_detail(code: str, message: str, remedy: Optional[str] = None) -> dict:
+    """Builds the error detail body shared by every AHPException."""
+    if remedy:
+        return {"error": {"code": code, "message": message, "remedy": remedy}}
+    return {"error": {"code": code, "message": message}}
+
 class AHPException(HTTPException):
     """Custom exception for AHP-specific errors."""
     def __init__(
@@ -11,20 +17,16 @@ class AHPException(HTTPException):
         status_code: int, 
         code: str, 
         message: str, 
-        remedy: Optional[str] = None
+        remedy: Optional[str] = None,
+        detail: Optional[dict] = None
     ):
         self.status_code = status_code
         self.code = code
         self.message = message
         self.remedy = remedy
-        detail = {
-            "error": {
-                "code": self.code,
-                "message": self.message,
-            }
-        }
-        if self.remedy:
-            detail["error"]["remedy"] = self.remedy
+        # Pre-defined errors pass a detail built once at import time; it is never mutated.
+        if detail is None:
+            detail = _make_detail(code, message, remedy)
         super().__init__(status_code=self.status_code, detail=detail)
 
 async def ahp_exception_handler(request: Request, exc: AHPException):
@@ -36,36 +38,58 @@ async def ahp_exception_handler(request: Request, exc: AHPException):
 
 # --- Pre-defined Exceptions ---
 
-def invalid_token_exception(detail: str = "Invalid or missing pre-shared access token."):
+# The auth and tool-name errors are raised on every rejected request, so their
+# messages and detail bodies are built once here.
+_INVALID_TOKEN_MESSAGE = "Invalid or missing pre-shared access token."
+_INVALID_TOKEN_REMEDY = "Ensure you are providing the correct 'token' query parameter."
+_INVALID_TOKEN_DETAIL = _make_detail("invalid_access_token", _INVALID_TOKEN_MESSAGE, _INVALID_TOKEN_REMEDY)
+
+_MISSING_BEARER_MESSAGE = "Missing 'bearer_token' query parameter."
+_MISSING_BEARER_REMEDY = "Send your bearer token in an 'Authorization: Bearer ...' header or in the query string, e.g., '&bearer_token=...'"
+_MISSING_BEARER_DETAIL = _make_detail("missing_bearer_token", _MISSING_BEARER_MESSAGE, _MISSING_BEARER_REMEDY)
+
+_INVALID_BEARER_MESSAGE = "Invalid or expired token."
+_INVALID_BEARER_REMEDY = "Request a new token via the '/auth?token=YOUR_PRE_SHARED_KEY' endpoint."
+_INVALID_BEARER_DETAIL = _make_detail("invalid_bearer_token", _INVALID_BEARER_MESSAGE, _INVALID_BEARER_REMEDY)
+
+_MISSING_TOOL_NAME_MESSAGE = "Missing 'name' query parameter for tool call."
+_MISSING_TOOL_NAME_REMEDY = "Specify the tool to use, e.g., '&name=my_tool'."
+_MISSING_TOOL_NAME_DETAIL = _make_detail("missing_tool_name", _MISSING_TOOL_NAME_MESSAGE, _MISSING_TOOL_NAME_REMEDY)
+
+def invalid_token_exception(detail: str = _INVALID_TOKEN_MESSAGE):
     return AHPException(
         status_code=403,
         code="invalid_access_token",
         message=detail,
-        remedy="Ensure you are providing the correct 'token' query parameter."
+        remedy=_INVALID_TOKEN_REMEDY,
+        detail=_INVALID_TOKEN_DETAIL if detail == _INVALID_TOKEN_MESSAGE else None
     )
 
 def missing_bearer_token_exception():
     return AHPException(
         status_code=401,
         code="missing_bearer_token",
-        message="Missing 'bearer_token' query parameter.",
-        remedy="Include your bearer token in the query string, e.g., '&bearer_token=...'"
+        message=_MISSING_BEARER_MESSAGE,
+        remedy=_MISSING_BEARER_REMEDY,
+        detail=_MISSING_BEARER_DETAIL
     )
 
-def invalid_bearer_token_exception(detail: str = "Invalid or expired token."):
+def invalid_bearer_token_exception(detail: str = _INVALID_BEARER_MESSAGE):
     return AHPException(
         status_code=401,
         code="invalid_bearer_token",
         message=detail,
-        remedy="Request a new token via the '/auth?token=YOUR_PRE_SHARED_KEY' endpoint."
+        remedy=_INVALID_BEARER_REMEDY,
+        detail=_INVALID_BEARER_DETAIL if detail == _INVALID_BEARER_MESSAGE else None
     )
 
 def missing_tool_name_exception():
     return AHPException(
         status_code=422,
         code="missing_tool_name",
-        message="Missing 'name' query parameter for tool call.",
-        remedy="Specify the tool to use, e.g., '&name=my_tool'."
+        message=_MISSING_TOOL_NAME_MESSAGE,
+        remedy=_MISSING_TOOL_NAME_REMEDY,
+        detail=_MISSING_TOOL_NAME_DETAIL
     )
 
 def tool_not_found_exception(tool_name: str):
@@ -82,6 +106,22 @@ def tool_execution_exception(tool_name: str, error: str):
         message=f"Tool '{tool_name}' failed to execute: {error}",
     )
 
+def invalid_batch_exception(detail: str):
+    return AHPException(
+        status_code=400,
+        code="invalid_batch_request",
+        message=f"Invalid batch request: {detail}",
+        remedy="POST a JSON body of the form {\"requests\": {\"<id>\": {\"tool\": \"<name>\", \"params\": {...}}}}."
+    )
+
+def invalid_request_body_exception(detail: str):
+    return AHPException(
+        status_code=400,
+        code="invalid_request_body",
+        message=f"Invalid request body: {detail}",
+        remedy="POST tool parameters as a JSON object, e.g., '{\"diff_text\": \"...\"}'."
+    )
+
 def session_not_found_exception(session_id: str):
     return AHPException(
         status_code=404,
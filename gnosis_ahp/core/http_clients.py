@@ -0,0 +1,27 @@
+"""
+Shared httpx clients for tools that call other HTTP services.
+
+Tool modules are executed again by the registry during discovery, so a client kept
+in a tool module's globals would not be the one the server closes on shutdown.
+Keeping the pool here gives every copy of a tool the same connections.
+"""
+from typing import Dict
+
+import httpx
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+def get_http_client(base_url: str, **kwargs) -> httpx.AsyncClient:
+    """Get the pooled client for `base_url`, creating it on first use. `kwargs` only apply then."""
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(base_url=base_url, **kwargs)
+        _clients[base_url] = client
+    return client
+
+async def close_http_clients() -> None:
+    """Close every pooled client; called on server shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
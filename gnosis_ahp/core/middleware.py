@@ -25,17 +25,20 @@ class ApertureMiddleware(BaseHTTPMiddleware):
         super().__init__(app)
         self.tool_registry = get_global_registry()
         self.aperture_service = get_aperture_service()
+        # Tools are discovered after the middleware is built, so read the registry's
+        # live paid-tool set rather than snapshotting it here.
+        self._paid_tools = self.tool_registry.paid_tools
 
     async def dispatch(self, request: Request, call_next):
-        # Only apply to tool execution paths
+        # Only apply to paid tool execution paths; reserved names are never registered as tools
         path_parts = request.url.path.strip("/").split("/")
-        if len(path_parts) == 1 and path_parts[0] not in self.tool_registry.RESERVED_NAMES:
+        if len(path_parts) == 1 and path_parts[0] in self._paid_tools:
             tool_name = path_parts[0]
             
             try:
                 tool_instance = self.tool_registry.get_tool(tool_name)
                 
-                if tool_instance and tool_instance.cost > 0:
+                if tool_instance.cost > 0:
                     # This is a premium tool, check for payment
                     params = dict(request.query_params)
                     invoice_id = params.get("invoice_id")
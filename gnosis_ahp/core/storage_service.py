@@ -289,6 +289,94 @@ class StorageService:
             
             return await asyncio.to_thread(read_local_file)
 
+    async def file_exists(self, filename: str, session_hash: Optional[str] = None) -> bool:
+        """
+        Check whether a file exists without downloading it
+        
+        Args:
+            filename: Name of file
+            session_hash: Optional session context
+            
+        Returns:
+            True if the file exists
+        """
+        if session_hash:
+            file_path = self.get_session_file_path(session_hash, filename)
+        else:
+            file_path = f"{self.get_user_path()}/{filename}"
+        
+        if self._is_cloud:
+            # GCS branch - a metadata request, not a download
+            return await asyncio.to_thread(self._bucket.blob(file_path).exists)
+        else:
+            # Local filesystem branch
+            return await asyncio.to_thread(os.path.isfile, f"{self._storage_root}/{file_path}")
+
+    async def copy_file(self, src_filename: str, dst_filename: str,
+                        session_hash: Optional[str] = None) -> str:
+        """
+        Copy a file within storage without routing its bytes through Python.
+        GCS copies server-side; locally os.copy_file_range is used (a reflink on
+        btrfs/xfs), falling back to shutil when the kernel or filesystem refuses.
+        
+        Args:
+            src_filename: Name of the existing file
+            dst_filename: Name of the copy
+            session_hash: Optional session context
+            
+        Returns:
+            Path where the copy was saved
+            
+        Raises:
+            FileNotFoundError: If the source file doesn't exist
+        """
+        if session_hash:
+            src_path = self.get_session_file_path(session_hash, src_filename)
+            dst_path = self.get_session_file_path(session_hash, dst_filename)
+        else:
+            src_path = f"{self.get_user_path()}/{src_filename}"
+            dst_path = f"{self.get_user_path()}/{dst_filename}"
+        
+        if self._is_cloud:
+            # GCS branch
+            src_blob = self._bucket.blob(src_path)
+            try:
+                await asyncio.to_thread(self._bucket.copy_blob, src_blob, self._bucket, dst_path)
+            except NotFound:
+                raise FileNotFoundError(f"File not found: {src_path}")
+            logger.info(f"Copied file in GCS: {src_path} -> {dst_path}")
+        else:
+            # Local filesystem branch
+            full_src = f"{self._storage_root}/{src_path}"
+            full_dst = f"{self._storage_root}/{dst_path}"
+            
+            def copy_local_file():
+                if not os.path.exists(full_src):
+                    raise FileNotFoundError(f"File not found: {full_src}")
+                os.makedirs(os.path.dirname(full_dst), exist_ok=True)
+                if hasattr(os, 'copy_file_range'):
+                    try:
+                        with open(full_src, 'rb') as src, open(full_dst, 'wb') as dst:
+                            remaining = os.fstat(src.fileno()).st_size
+                            while remaining > 0:
+                                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                                if copied == 0:
+                                    break
+                                remaining -= copied
+                        if remaining == 0:
+                            shutil.copystat(full_src, full_dst)
+                            return
+                    except OSError:
+                        # EXDEV, ENOSYS, EINVAL etc. - use the portable copy below
+                        pass
+                shutil.copyfile(full_src, full_dst)
+                shutil.copystat(full_src, full_dst)
+            
+            await asyncio.to_thread(copy_local_file)
+            logger.info(f"Copied file locally: {full_src} -> {full_dst}")
+        
+        return dst_path
+
 
     
     async def delete_file(self, filename: str, session_hash: Optional[str] = None) -> bool:
@@ -389,17 +477,19 @@ class StorageService:
             
             def list_local_items():
                 local_items = []
-                if os.path.exists(full_path) and os.path.isdir(full_path):
-                    for item in os.listdir(full_path):
-                        item_path = os.path.join(full_path, item)
-                        stat = os.stat(item_path)
-                        item_type = 'directory' if os.path.isdir(item_path) else 'file'
-                        local_items.append({
-                            'name': item,
-                            'type': item_type,
-                            'size': stat.st_size,
-                            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                        })
+                if os.path.isdir(full_path):
+                    # scandir's DirEntry carries the file type from the directory read,
+                    # so each entry costs one stat instead of stat + isdir.
+                    with os.scandir(full_path) as entries:
+                        for entry in entries:
+                            stat = entry.stat()
+                            item_type = 'directory' if entry.is_dir() else 'file'
+                            local_items.append({
+                                'name': entry.name,
+                                'type': item_type,
+                                'size': stat.st_size,
+                                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+                            })
                 return local_items
             
             items = await asyncio.to_thread(list_local_items)
@@ -3,22 +3,96 @@ This tool manages saving, loading, and listing agent identities.
 It uses the StorageService to manage agent data as individual files within a user's session.
 """
 
+import asyncio
+import functools
 import json
 import logging
+import os
 import re
 from typing import Dict, Any, List, Optional
 
+import orjson
+
 from gnosis_ahp.tools.base import tool
 from gnosis_ahp.core.storage_service import StorageService
 
+
 logger = logging.getLogger(__name__)
 
 AGENTS_DIR = "agents"
+_AGENT_NAME_RE = re.compile(r'[^a-zA-Z0-9_-]')
+
+# Agents larger than this are (de)serialized in a worker thread so a multi-KB
+# narrative doesn't stall the event loop for other tool calls.
+_OFFLOAD_THRESHOLD = 4096
+
+# System prompt produced by embody_agent; the static text is parsed once at import.
+_EMBODY_TEMPLATE = (
+    "You are now embodying the agent '{name}'. Maintain this persona in all your responses. "
+    "Do not break character. Your core identity is defined by the following attributes:\n"
+    "- Primary Emotion: {primary_emotion}\n"
+    "- Secondary Emotion: {secondary_emotion}\n"
+    "- Core Trait: {trait}\n"
+    "- Quirk: {quirk}\n"
+    "- Guiding Philosophy: {philosophy}\n"
+    "- Narrative: {narrative}"
+)
+
+def _dumps(agent_data: Dict[str, Any]) -> bytes:
+    """Serializes agent data to indented JSON bytes with orjson."""
+    try:
+        return orjson.dumps(agent_data, option=orjson.OPT_INDENT_2)
+    except TypeError:
+        # orjson rejects some values the stdlib accepts (e.g. non-str keys, huge ints)
+        return json.dumps(agent_data, indent=2).encode('utf-8')
 
+def _loads(content: bytes) -> Any:
+    """
+    Decodes JSON straight from bytes with orjson.
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the stdlib one.
+    """
+    return orjson.loads(content)
+
+@functools.lru_cache(maxsize=1024)
 def _agent_filename(agent_name: str) -> str:
-    """Generates a safe filename for an agent."""
-    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', agent_name)
-    return f"{AGENTS_DIR}/{safe_name}.json"
+    """Generates a safe filename for an agent. Memoized, since the same names are saved, loaded and embodied repeatedly."""
+    return f"{AGENTS_DIR}/{_AGENT_NAME_RE.sub('_', agent_name)}.json"
+
+def _agent_names(files: List[Dict[str, Any]]) -> List[str]:
+    """Agent names from an AGENTS_DIR listing: the .json files, e.g. "agents/Viek.json" -> "Viek"."""
+    return [
+        os.path.basename(f['name']).removesuffix('.json')
+        for f in files
+        if f.get('type') != 'directory' and f['name'].endswith('.json')
+    ]
+
+async def _save_agent_impl(session: Dict[str, Any], agent_name: str, agent_data: Dict[str, Any]) -> str:
+    """
+    Normalizes, serializes and writes one agent, shared by save_agent and save_agents.
+    Returns the stored path; raises on failure.
+    """
+    if not agent_name:
+        raise ValueError("agent_name must be provided.")
+    session_id = session["id"]
+    filename = _agent_filename(agent_name)
+
+    # Ensure the 'name' field in the data matches the agent_name
+    original_name = agent_data.get('name')
+    agent_data['name'] = agent_name
+    
+    # Also update the name in the narrative if it exists and the name actually changed
+    if original_name and original_name != agent_name and 'narrative' in agent_data:
+        agent_data['narrative'] = agent_data['narrative'].replace(original_name, agent_name)
+
+    narrative = agent_data.get('narrative')
+    if isinstance(narrative, str) and len(narrative) > _OFFLOAD_THRESHOLD:
+        content_bytes = await asyncio.to_thread(_dumps, agent_data)
+    else:
+        content_bytes = _dumps(agent_data)
+
+    storage: StorageService = session["storage"]
+    await storage.save_file(content_bytes, filename, session_hash=session_id)
+    return filename
 
 @tool(description="Saves an agent identity to the current session.", session_required=True)
 async def save_agent(agent_name: str, agent_data: Dict[str, Any], session: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -45,22 +119,8 @@ async def save_agent(agent_name: str, agent_data: Dict[str, Any], session: Dict[
         except json.JSONDecodeError:
             return {"success": False, "error": "Invalid agent_data JSON format."}
 
-    storage: StorageService = session["storage"]
-    session_id = session["id"]
-    filename = _agent_filename(agent_name)
-
     try:
-        # Ensure the 'name' field in the data matches the agent_name
-        original_name = agent_data.get('name')
-        agent_data['name'] = agent_name
-        
-        # Also update the name in the narrative if it exists
-        if original_name and 'narrative' in agent_data:
-            agent_data['narrative'] = agent_data['narrative'].replace(original_name, agent_name)
-
-        content_bytes = json.dumps(agent_data, indent=2).encode('utf-8')
-        await storage.save_file(content_bytes, filename, session_hash=session_id)
-        
+        filename = await _save_agent_impl(session, agent_name, agent_data)
         message = f"Agent '{agent_name}' saved successfully."
         return {"success": True, "message": message, "path": filename}
 
@@ -69,6 +129,73 @@ async def save_agent(agent_name: str, agent_data: Dict[str, Any], session: Dict[
         return {"success": False, "error": f"An unexpected error occurred: {e}"}
 
 
+@tool(description="Saves several agent identities to the current session in one call.", session_required=True)
+async def save_agents(agents: Dict[str, Any], session: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Saves several agents at once. The writes are issued concurrently, so a remote
+    storage backend costs about one round trip instead of one per agent.
+
+    Args:
+        agents: A dictionary mapping each agent name to its agent data.
+        session: The current session object, provided by the system.
+
+    Returns:
+        The saved paths by agent name, plus any agents that failed to save.
+    """
+    if not session:
+        return {"success": False, "error": "A session is required to save agents."}
+
+    # The 'agents' parameter may come in as a JSON string.
+    try:
+        if isinstance(agents, str):
+            agents = json.loads(agents)
+        if not isinstance(agents, dict) or not agents:
+            return {"success": False, "error": "agents must be a non-empty object of agent_name -> agent_data."}
+        agents = {name: json.loads(data) if isinstance(data, str) else data for name, data in agents.items()}
+    except json.JSONDecodeError:
+        return {"success": False, "error": "Invalid agents JSON format."}
+
+    names = list(agents)
+    results = await asyncio.gather(
+        *[_save_agent_impl(session, name, agents[name]) for name in names],
+        return_exceptions=True
+    )
+
+    saved = {}
+    errors = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error saving agent '{name}': {result}")
+            errors[name] = str(result)
+        else:
+            saved[name] = result
+
+    response = {"success": not errors, "count": len(saved), "saved": saved}
+    if errors:
+        response["errors"] = errors
+    return response
+
+
+async def _load_agent_impl(session: Dict[str, Any], agent_name: str) -> Dict[str, Any]:
+    """
+    Reads and decodes an agent's file, shared by load_agent and embody_agent.
+    Raises FileNotFoundError or json.JSONDecodeError rather than wrapping them in a result dict.
+    """
+    storage: StorageService = session["storage"]
+    content_bytes = await storage.get_file(_agent_filename(agent_name), session_hash=session["id"])
+    if len(content_bytes) > _OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(_loads, content_bytes)
+    return _loads(content_bytes)
+
+def _load_error(agent_name: str, e: Exception) -> Dict[str, Any]:
+    """Maps an exception from _load_agent_impl to the tools' error result."""
+    if isinstance(e, FileNotFoundError):
+        return {"success": False, "error": f"Agent '{agent_name}' not found."}
+    if isinstance(e, json.JSONDecodeError):
+        return {"success": False, "error": f"Could not decode data for agent '{agent_name}'."}
+    logger.error(f"Error loading agent '{agent_name}': {e}", exc_info=True)
+    return {"success": False, "error": f"An unexpected error occurred: {e}"}
+
 @tool(description="Loads an agent identity from the current session.", session_required=True)
 async def load_agent(agent_name: str, session: Dict[str, Any] = None) -> Dict[str, Any]:
     """
@@ -86,21 +213,11 @@ async def load_agent(agent_name: str, session: Dict[str, Any] = None) -> Dict[st
     if not agent_name:
         return {"success": False, "error": "agent_name must be provided."}
 
-    storage: StorageService = session["storage"]
-    session_id = session["id"]
-    filename = _agent_filename(agent_name)
-
     try:
-        content_bytes = await storage.get_file(filename, session_hash=session_id)
-        agent_data = json.loads(content_bytes.decode('utf-8'))
-        return {"success": True, "data": agent_data}
-    except FileNotFoundError:
-        return {"success": False, "error": f"Agent '{agent_name}' not found."}
-    except json.JSONDecodeError:
-        return {"success": False, "error": f"Could not decode data for agent '{agent_name}'."}
+        agent_data = await _load_agent_impl(session, agent_name)
     except Exception as e:
-        logger.error(f"Error loading agent '{agent_name}': {e}", exc_info=True)
-        return {"success": False, "error": f"An unexpected error occurred: {e}"}
+        return _load_error(agent_name, e)
+    return {"success": True, "data": agent_data}
 
 
 @tool(description="Lists all saved agent identities in the current session.", session_required=True)
@@ -122,8 +239,7 @@ async def list_agents(session: Dict[str, Any] = None) -> Dict[str, Any]:
 
     try:
         files = await storage.list_files(prefix=AGENTS_DIR, session_hash=session_id)
-        # Extract agent names from filenames like "agents/Viek.json"
-        agent_names = [f['name'].split('/')[-1].replace('.json', '') for f in files]
+        agent_names = _agent_names(files)
         return {"success": True, "count": len(agent_names), "agents": agent_names}
     except FileNotFoundError:
         # This is not an error, it just means no agents have been saved yet.
@@ -132,6 +248,55 @@ async def list_agents(session: Dict[str, Any] = None) -> Dict[str, Any]:
         logger.error(f"Error listing agents: {e}", exc_info=True)
         return {"success": False, "error": f"An unexpected error occurred: {e}"}
 
+@tool(description="Loads every saved agent identity in the current session.", session_required=True)
+async def load_all_agents(session: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Loads all saved agents. The per-agent reads are issued concurrently, so a remote
+    storage backend costs about one round trip instead of one per agent.
+
+    Args:
+        session: The current session object, provided by the system.
+
+    Returns:
+        A list of agent data dictionaries, plus any agents that could not be read.
+    """
+    if not session:
+        return {"success": False, "error": "A session is required to load agents."}
+
+    storage: StorageService = session["storage"]
+    session_id = session["id"]
+
+    try:
+        files = await storage.list_files(prefix=AGENTS_DIR, session_hash=session_id)
+    except FileNotFoundError:
+        # No agents have been saved yet.
+        return {"success": True, "count": 0, "agents": []}
+    except Exception as e:
+        logger.error(f"Error listing agents: {e}", exc_info=True)
+        return {"success": False, "error": f"An unexpected error occurred: {e}"}
+
+    names = _agent_names(files)
+    contents = await asyncio.gather(
+        *[storage.get_file(f"{AGENTS_DIR}/{name}.json", session_hash=session_id) for name in names],
+        return_exceptions=True
+    )
+
+    agents = []
+    errors = {}
+    for agent_name, content in zip(names, contents):
+        if isinstance(content, Exception):
+            errors[agent_name] = str(content)
+            continue
+        try:
+            agents.append(_loads(content))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            errors[agent_name] = "Could not decode agent data."
+
+    result = {"success": True, "count": len(agents), "agents": agents}
+    if errors:
+        result["errors"] = errors
+    return result
+
 @tool(description="Loads an agent and formats its identity as a system prompt.", session_required=True)
 async def embody_agent(agent_name: str, session: Dict[str, Any] = None) -> Dict[str, Any]:
     """
@@ -146,34 +311,34 @@ async def embody_agent(agent_name: str, session: Dict[str, Any] = None) -> Dict[
     """
     if not session:
         return {"success": False, "error": "A session is required to embody an agent."}
+    if not agent_name:
+        return {"success": False, "error": "agent_name must be provided."}
     
-    # First, load the agent data using the existing load_agent tool logic
-    load_result = await load_agent(agent_name=agent_name, session=session)
-    
-    if not load_result.get("success"):
-        return load_result # Pass through the error from load_agent
-        
-    agent_data = load_result.get("data", {})
+    # First, load the agent data, reporting errors exactly as load_agent does
+    try:
+        agent_data = await _load_agent_impl(session, agent_name)
+    except Exception as e:
+        return _load_error(agent_name, e)
 
     # Now, format the loaded data into a system prompt
     try:
         name = agent_data.get('name', 'Unknown')
-        primary_emotion = agent_data.get('emotional_state', {}).get('primary', 'unknown')
-        secondary_emotion = agent_data.get('emotional_state', {}).get('secondary', 'unknown')
+        emotional_state = agent_data.get('emotional_state') or {}
+        primary_emotion = emotional_state.get('primary', 'unknown')
+        secondary_emotion = emotional_state.get('secondary', 'unknown')
         trait = agent_data.get('trait', 'unknown')
         quirk = agent_data.get('quirk', 'none')
         philosophy = agent_data.get('philosophy', 'To be determined.')
         narrative = agent_data.get('narrative', '')
 
-        prompt = (
-            f"You are now embodying the agent '{name}'. Maintain this persona in all your responses. "
-            f"Do not break character. Your core identity is defined by the following attributes:\n"
-            f"- Primary Emotion: {primary_emotion}\n"
-            f"- Secondary Emotion: {secondary_emotion}\n"
-            f"- Core Trait: {trait}\n"
-            f"- Quirk: {quirk}\n"
-            f"- Guiding Philosophy: {philosophy}\n"
-            f"- Narrative: {narrative}"
+        prompt = _EMBODY_TEMPLATE.format(
+            name=name,
+            primary_emotion=primary_emotion,
+            secondary_emotion=secondary_emotion,
+            trait=trait,
+            quirk=quirk,
+            philosophy=philosophy,
+            narrative=narrative
         )
         
         return {"success": True, "prompt": prompt}
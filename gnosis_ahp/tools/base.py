@@ -3,11 +3,18 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional, Callable, get_type_hints, AsyncGenerator
 from dataclasses import dataclass
+import functools
 import inspect
 import json
+import sys
 
 
-@dataclass
+# dataclass(slots=True) needs Python 3.10+; the Docker image still runs 3.9, where
+# ToolResult keeps its __dict__.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class ToolResult:
     """Result from tool execution."""
     success: bool
@@ -16,6 +23,52 @@ class ToolResult:
     metadata: Optional[Dict[str, Any]] = None
 
 
+def _identity(value: Any) -> Any:
+    return value
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass  # Keep original value if conversion fails
+    return value
+
+def _to_float(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass  # Keep original value if conversion fails
+    return value
+
+def _to_bool(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes')
+    return value
+
+@functools.lru_cache(maxsize=None)
+def _introspect(func: Callable):
+    """
+    Resolves a function's type hints and signature once; wrapping the same function again
+    (reloaded modules, test harnesses) reuses the result. Callers must not mutate either.
+    """
+    return get_type_hints(func), inspect.signature(func)
+
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+    type(None): "null"
+}
+
+# String arguments (e.g. from a query string) are converted for these type hints; others pass through.
+_CONVERTERS = {int: _to_int, float: _to_float, bool: _to_bool}
+
+
 class BaseTool(ABC):
     """Abstract base class for tools."""
     
@@ -108,20 +161,67 @@ class FunctionTool(BaseTool):
         # Set the name attribute on the instance
         self.name = tool_name
         
-        # Extract type hints for schema generation
-        self.type_hints = get_type_hints(func)
-        self.signature = inspect.signature(func)
-
+    # Introspection is deferred until a tool is first described or called, so importing
+    # a tools module only records the function; each property is computed once.
+    
+    @functools.cached_property
+    def type_hints(self) -> Dict[str, Any]:
+        return _introspect(self.func)[0]
+    
+    @functools.cached_property
+    def signature(self) -> inspect.Signature:
+        return _introspect(self.func)[1]
+    
+    @functools.cached_property
+    def _param_names(self) -> frozenset:
+        return frozenset(self.signature.parameters)
+    
+    @functools.cached_property
+    def _converters(self) -> Dict[str, Callable[[Any], Any]]:
+        # Resolve each parameter's converter once instead of inspecting type hints on every call
+        return {
+            param_name: _CONVERTERS[hint]
+            for param_name, hint in self.type_hints.items()
+            if isinstance(hint, type) and hint in _CONVERTERS
+        }
+    
+    @functools.cached_property
+    def _param_json_types(self) -> Dict[str, str]:
+        # JSON schema type per public parameter, in signature order
+        return {
+            param_name: self._python_type_to_json_type(self.type_hints.get(param_name, Any))
+            for param_name in self.signature.parameters
+            if param_name not in ('self', 'session')  # Hide session from the public schema
+        }
+    
+    @functools.cached_property
+    def _passthrough_args(self) -> bool:
+        # True when validate_arguments would return its input unchanged (no typed
+        # parameters to convert and not overridden by a subclass)
+        return not self._converters and type(self).validate_arguments is FunctionTool.validate_arguments
+    
+    @functools.cached_property
+    def _schema(self) -> Dict[str, Any]:
+        # The schema depends only on the signature, so it is built once
+        return self._build_schema()
+    
+    def _tool_args(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Separates tool arguments from context; 'session' is kept only if the function takes it.
+        When every key is a parameter (the common case) kwargs is passed through unchanged.
+        """
+        if kwargs.keys() <= self._param_names:
+            return kwargs
+        return {k: v for k, v in kwargs.items() if k in self._param_names}
     
     async def execute(self, **kwargs) -> ToolResult:
         """Execute the wrapped function."""
         try:
-            # Separate tool arguments from context, but ensure 'session' is always passed if the tool needs it.
-            tool_args = {k: v for k, v in kwargs.items() if k in self.signature.parameters}
-            if 'session' in self.signature.parameters and 'session' in kwargs:
-                tool_args['session'] = kwargs['session']
-
-            validated_args = self.validate_arguments(**tool_args)
+            if self._passthrough_args:
+                # Nothing to convert: hand the filtered kwargs straight to the function
+                validated_args = self._tool_args(kwargs)
+            else:
+                validated_args = self.validate_arguments(**self._tool_args(kwargs))
             
             if self.is_async:
                 result = await self.func(**validated_args)
@@ -136,10 +236,7 @@ class FunctionTool(BaseTool):
     async def execute_streaming(self, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
         """Execute the wrapped function and stream results."""
         try:
-            # Separate tool arguments from context, but ensure 'session' is always passed if the tool needs it.
-            tool_args = {k: v for k, v in kwargs.items() if k in self.signature.parameters}
-            if 'session' in self.signature.parameters and 'session' in kwargs:
-                tool_args['session'] = kwargs['session']
+            tool_args = self._tool_args(kwargs)
                 
             validated_args = self.validate_arguments(**tool_args)
 
@@ -159,17 +256,17 @@ class FunctionTool(BaseTool):
             yield {"type": "error", "error": str(e)}
     
     def get_schema(self) -> Dict[str, Any]:
+        """Get the schema generated from the function signature."""
+        return self._schema
+    
+    def _build_schema(self) -> Dict[str, Any]:
         """Generate schema from function signature."""
         properties = {}
         required = []
         
-        for param_name, param in self.signature.parameters.items():
-            if param_name in ['self', 'session']: # Hide session from the public schema
-                continue
-                
-            # Get type information
-            param_type = self.type_hints.get(param_name, Any)
-            type_name = self._python_type_to_json_type(param_type)
+        parameters = self.signature.parameters
+        for param_name, type_name in self._param_json_types.items():
+            param = parameters[param_name]
             
             # Build property schema
             prop_schema = {"type": type_name}
@@ -199,16 +296,6 @@ class FunctionTool(BaseTool):
     
     def _python_type_to_json_type(self, python_type: Any) -> str:
         """Convert Python type to JSON schema type."""
-        type_mapping = {
-            str: "string",
-            int: "integer",
-            float: "number",
-            bool: "boolean",
-            list: "array",
-            dict: "object",
-            type(None): "null"
-        }
-        
         # Handle Optional types
         origin = getattr(python_type, '__origin__', None)
         if origin is not None:
@@ -217,34 +304,12 @@ class FunctionTool(BaseTool):
             elif origin is dict:
                 return "object"
         
-        return type_mapping.get(python_type, "string")
+        return _JSON_TYPES.get(python_type, "string")
     
     def validate_arguments(self, **kwargs) -> Dict[str, Any]:
         """Validate and convert arguments based on type hints."""
-        validated = {}
-        
-        for param_name, param_value in kwargs.items():
-            if param_name in self.type_hints:
-                expected_type = self.type_hints[param_name]
-                
-                # Convert string to expected type if needed
-                if isinstance(param_value, str) and expected_type != str:
-                    try:
-                        if expected_type == int:
-                            param_value = int(param_value)
-                        elif expected_type == float:
-                            param_value = float(param_value)
-                        elif expected_type == bool:
-                            param_value = param_value.lower() in ('true', '1', 'yes')
-                    except ValueError:
-                        pass  # Keep original value if conversion fails
-                
-                validated[param_name] = param_value
-            else:
-                # No type hint, keep as is
-                validated[param_name] = param_value
-        
-        return validated
+        converter = self._converters.get
+        return {name: converter(name, _identity)(value) for name, value in kwargs.items()}
 
 
 class DualUseTool(FunctionTool):
@@ -1,35 +1,120 @@
 """
 AHP Tool for calculating mathematical expressions.
 """
+import ast
+import functools
 import math
+import operator
 from typing import Dict, Any
 
 from gnosis_ahp.tools.base import tool
 
+# calculate runs on the event loop, so operations whose cost grows with their
+# operands are capped: an integer power may produce at most this many bits...
+MAX_POW_BITS = 100_000
+# ...and factorial takes arguments up to this.
+MAX_FACTORIAL = 1000
+
+def _limited_factorial(n):
+    if n > MAX_FACTORIAL:
+        raise ValueError(f"factorial() argument must be at most {MAX_FACTORIAL}")
+    return math.factorial(n)
+
+def _limited_pow(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int) and abs(base) > 1 and exponent > 0:
+        if base.bit_length() * exponent > MAX_POW_BITS:
+            raise ValueError(f"Result of power is too large (limit {MAX_POW_BITS} bits)")
+    return operator.pow(base, exponent)
+
+# Safe math functions dictionary
+ALLOWED_NAMES = {
+    'sqrt': math.sqrt, 'pi': math.pi, 'e': math.e,
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'log': math.log, 'log10': math.log10, 'exp': math.exp,
+    'pow': math.pow, 'ceil': math.ceil, 'floor': math.floor,
+    'factorial': _limited_factorial, 'abs': abs,
+    'round': round, 'max': max, 'min': min, 'sum': sum
+}
+
+_BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub,
+    ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.Pow: _limited_pow
+}
+
+_UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.not_}
+
+_COMPARE_OPS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne
+}
+
+@functools.lru_cache(maxsize=512)
+def _parse(expression: str) -> ast.expr:
+    """Parses an expression once; repeated expressions reuse the tree."""
+    return ast.parse(expression.replace('^', '**'), mode='eval').body  # Support ^ for powers
+
+def _eval_node(node: ast.expr):
+    """
+    Evaluates a parsed expression over numbers, booleans, flat list/tuple literals of numbers,
+    arithmetic, comparison and boolean operators, and ALLOWED_NAMES.
+    Anything else (attributes, subscripts, lambdas, ...) is rejected rather than run.
+    """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, bool):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        return _BINARY_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPS for op in node.ops):
+        # Chained like Python: 1 < x < 3 compares pairwise and stops at the first False
+        left = _eval_node(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _eval_node(comparator)
+            if not _COMPARE_OPS[type(op)](left, right):
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.BoolOp):
+        # Short-circuits and returns an operand, as `and`/`or` do
+        is_and = isinstance(node.op, ast.And)
+        for value_node in node.values:
+            value = _eval_node(value_node)
+            if bool(value) != is_and:
+                return value
+        return value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        # Sequences exist to feed max/min/sum, so their elements must evaluate to numbers
+        values = [_eval_node(elt) for elt in node.elts]
+        if any(type(value) not in (int, float) for value in values):
+            raise ValueError(f"{type(node).__name__} elements must be numbers")
+        return values if isinstance(node, ast.List) else tuple(values)
+    if isinstance(node, ast.Name):
+        if node.id not in ALLOWED_NAMES:
+            raise NameError(f"name '{node.id}' is not defined")
+        return ALLOWED_NAMES[node.id]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        func = _eval_node(node.func)
+        args = [_eval_node(arg) for arg in node.args]
+        kwargs = {kw.arg: _eval_node(kw.value) for kw in node.keywords}
+        return func(*args, **kwargs)
+    raise ValueError(f"Unsupported expression element: {type(node).__name__}")
+
 @tool(description="Calculates mathematical expressions with math module functions.")
 async def calculate(expression: str) -> Dict[str, Any]:
     """
     Calculates mathematical expressions with math module functions.
-    
+
     Args:
         expression: Math expression (e.g., "2 + 3 * 4", "sqrt(16) + pi")
-    
+
     Returns:
         Dictionary with result or error information
     """
-    # Safe math functions dictionary
-    allowed_names = {
-        'sqrt': math.sqrt, 'pi': math.pi, 'e': math.e,
-        'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-        'log': math.log, 'log10': math.log10, 'exp': math.exp,
-        'pow': math.pow, 'ceil': math.ceil, 'floor': math.floor,
-        'factorial': math.factorial, 'abs': abs,
-        'round': round, 'max': max, 'min': min
-    }
-
     try:
-        expression = expression.replace('^', '**')  # Support ^ for powers
-        result = eval(expression, {"__builtins__": None}, allowed_names)
+        result = _eval_node(_parse(expression))
         return {"success": True, "result": result}
     except Exception as e:
         return {"success": False, "error": "Calculation failed", "reason": str(e)}
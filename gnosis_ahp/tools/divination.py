@@ -145,54 +145,62 @@ HEXAGRAM_PHILOSOPHIES = {
     63: "After completion, remain vigilant for the seeds of new decline.",
     64: "Before completion, focus all energies toward the final goal."
 }
+
+# (name, meaning, philosophy) indexed directly by hexagram number; slot 0 is unused
+_DEFAULT_PHILOSOPHY = "The way unfolds according to its own nature."
+_HEX_DETAILS = (None,) + tuple(
+    (HEXAGRAMS[i]["name"], HEXAGRAMS[i]["meaning"], HEXAGRAM_PHILOSOPHIES.get(i, _DEFAULT_PHILOSOPHY))
+    for i in range(1, 65)
+)
 #</editor-fold>
 
 #<editor-fold desc="Helper Functions">
-def cast_coins():
-    """Cast three coins and return the result as a value 6, 7, 8, or 9."""
-    coins = [random.choice(["heads", "tails"]) for _ in range(3)]
-    heads_count = coins.count("heads")
-    if heads_count == 3: return 9
-    elif heads_count == 2: return 7
-    elif heads_count == 1: return 8
-    else: return 6
+# Line value by number of heads among three coins: 0 -> 6, 1 -> 8, 2 -> 7, 3 -> 9
+_LINE_BY_HEADS = (6, 8, 7, 9)
+
+# Hexagram number by (lower trigram * 8 + upper trigram), each trigram read as 3 bits
+_HEX_LOOKUP = (
+    1, 34, 5, 26, 11, 9, 14, 43,   25, 51, 3, 27, 24, 42, 21, 17,
+    6, 40, 29, 4, 7, 59, 64, 47,   33, 62, 39, 52, 15, 53, 56, 31,
+    12, 16, 8, 23, 2, 20, 35, 45,  44, 32, 48, 18, 46, 57, 50, 28,
+    13, 55, 63, 22, 36, 37, 30, 49, 10, 54, 60, 41, 19, 61, 38, 58
+)
+
+def _hexagram_number(binary):
+    """Map six yang(1)/yin(0) lines to a hexagram number."""
+    return _HEX_LOOKUP[32 * binary[0] + 16 * binary[1] + 8 * binary[2] + 4 * binary[3] + 2 * binary[4] + binary[5]]
 
-def _cast_hexagram():
+def _cast_hexagram(rng=random):
     """Cast a complete hexagram and identify changing lines."""
-    lines = [cast_coins() for _ in range(6)]
-    primary_binary = [1 if line in [7, 9] else 0 for line in lines]
-    primary_trigrams = (
-        4 * primary_binary[0] + 2 * primary_binary[1] + primary_binary[2],
-        4 * primary_binary[3] + 2 * primary_binary[4] + primary_binary[5]
-    )
-    hexagram_lookup = [
-        [1, 34, 5, 26, 11, 9, 14, 43], [25, 51, 3, 27, 24, 42, 21, 17],
-        [6, 40, 29, 4, 7, 59, 64, 47], [33, 62, 39, 52, 15, 53, 56, 31],
-        [12, 16, 8, 23, 2, 20, 35, 45], [44, 32, 48, 18, 46, 57, 50, 28],
-        [13, 55, 63, 22, 36, 37, 30, 49], [10, 54, 60, 41, 19, 61, 38, 58]
+    # 18 random bits are the 18 coin tosses; each line is one 3-bit group
+    bits = rng.getrandbits(18)
+    lines = [
+        _LINE_BY_HEADS[(bits >> (3 * i) & 1) + (bits >> (3 * i + 1) & 1) + (bits >> (3 * i + 2) & 1)]
+        for i in range(6)
     ]
-    primary_hexagram = hexagram_lookup[primary_trigrams[0]][primary_trigrams[1]]
+    # 7 and 9 (yang) are odd, 6 and 8 (yin) are even
+    primary_binary = [line & 1 for line in lines]
+    primary_hexagram = _hexagram_number(primary_binary)
     changing_lines = [i + 1 for i, line in enumerate(lines) if line in [6, 9]]
     transformed_hexagram = None
     if changing_lines:
         transformed_binary = [(1 if line == 6 else 0 if line == 9 else v) for line, v in zip(lines, primary_binary)]
-        transformed_trigrams = (
-            4 * transformed_binary[0] + 2 * transformed_binary[1] + transformed_binary[2],
-            4 * transformed_binary[3] + 2 * transformed_binary[4] + transformed_binary[5]
-        )
-        transformed_hexagram = hexagram_lookup[transformed_trigrams[0]][transformed_trigrams[1]]
+        transformed_hexagram = _hexagram_number(transformed_binary)
     return {"primary": primary_hexagram, "changing_lines": changing_lines, "transformed": transformed_hexagram}
 
 def get_hexagram_details(hexagram_casting):
     """Get full details for a hexagram casting including names, meanings, etc."""
     primary = hexagram_casting["primary"]
     transformed = hexagram_casting["transformed"]
-    primary_details = HEXAGRAMS.get(primary, {})
-    transformed_details = HEXAGRAMS.get(transformed, {}) if transformed else None
-    philosophy = HEXAGRAM_PHILOSOPHIES.get(primary, "The way unfolds according to its own nature.")
+    name, meaning, philosophy = _HEX_DETAILS[primary]
+    if transformed:
+        transformed_name, transformed_meaning, _ = _HEX_DETAILS[transformed]
+        transformed_details = {"number": transformed, "name": transformed_name, "meaning": transformed_meaning}
+    else:
+        transformed_details = None
     return {
-        "primary": {"number": primary, "name": primary_details.get("name"), "meaning": primary_details.get("meaning")},
-        "transformed": {"number": transformed, "name": transformed_details.get("name"), "meaning": transformed_details.get("meaning")} if transformed else None,
+        "primary": {"number": primary, "name": name, "meaning": meaning},
+        "transformed": transformed_details,
         "changing_lines": hexagram_casting["changing_lines"],
         "philosophy": philosophy
     }
@@ -209,8 +217,8 @@ async def cast_hexagram(seed: int = None) -> Dict[str, Any]:
     Returns:
         A dictionary containing the hexagram reading.
     """
-    if seed:
-        random.seed(seed)
+    # A seeded cast gets its own generator so it doesn't reseed the process-wide one.
+    rng = random.Random(seed) if seed is not None else random
     
-    hexagram_casting = _cast_hexagram()
+    hexagram_casting = _cast_hexagram(rng)
     return get_hexagram_details(hexagram_casting)
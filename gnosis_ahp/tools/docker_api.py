@@ -6,9 +6,35 @@ import httpx
 from typing import Dict, Any, Optional
 
 from gnosis_ahp.tools.base import tool
+from gnosis_ahp.core.http_clients import get_http_client
 
 DOCKER_API_URL = os.getenv("DOCKER_API_URL", "http://host.docker.internal:5680")
 
+def _get_client() -> httpx.AsyncClient:
+    """One pooled client for all calls, so each command reuses a kept-alive connection."""
+    return get_http_client(
+        DOCKER_API_URL,
+        headers={"Content-Type": "application/json"},
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=8)
+    )
+
+# command -> (HTTP method, path template, required argument, request kwargs builder)
+_COMMANDS = {
+    "ps": ("GET", "/api/containers", None, lambda a: {"params": {"all": str(a["all"]).lower()}}),
+    "start": ("POST", "/api/containers/{container_id}/start", "container_id", lambda a: {"json": {}}),
+    "stop": ("POST", "/api/containers/{container_id}/stop", "container_id", lambda a: {"json": {}}),
+    "restart": ("POST", "/api/containers/{container_id}/restart", "container_id", lambda a: {"json": {}}),
+    "rm": ("DELETE", "/api/containers/{container_id}", "container_id", lambda a: {"params": {"force": str(a["force"]).lower()}}),
+    "logs": ("GET", "/api/containers/{container_id}/logs", "container_id", lambda a: {"params": {"tail": str(a["tail"])}}),
+    "stats": ("GET", "/api/containers/{container_id}/stats", "container_id", None),
+    "images": ("GET", "/api/images", None, None),
+    "pull": ("POST", "/api/images/pull", "image", lambda a: {"json": {"image": a["image"], "tag": a["tag"]}}),
+    "rmi": ("DELETE", "/api/images/{image}", "image", lambda a: {"params": {"force": str(a["force"]).lower()}}),
+    "health": ("GET", "/health", None, None),
+    "exec": ("POST", "/api/containers/{container_id}/exec", "container_id", lambda a: {"json": {"command": a["exec_command"]}}),
+}
+
 @tool(description="Interact with the Gnosis Docker API to manage containers and images.")
 async def docker_api(
     command: str,
@@ -18,6 +44,7 @@ async def docker_api(
     force: bool = False,
     all: bool = False,
     tail: int = 100,
+    exec_command: Optional[str] = None,
     # Add other parameters from the MCP tool as needed
 ) -> Dict[str, Any]:
     """
@@ -31,55 +58,39 @@ async def docker_api(
         force: Force the operation.
         all: Show all containers.
         tail: Number of log lines to show.
+        exec_command: The command to run for 'exec'.
 
     Returns:
         The JSON response from the Gnosis Docker API.
     """
-    async with httpx.AsyncClient(base_url=DOCKER_API_URL, headers={"Content-Type": "application/json"}) as client:
-        try:
-            if command == "ps":
-                params = {"all": str(all).lower()}
-                response = await client.get("/api/containers", params=params)
-            elif command == "start" and container_id:
-                response = await client.post(f"/api/containers/{container_id}/start", json={})
-            elif command == "stop" and container_id:
-                response = await client.post(f"/api/containers/{container_id}/stop", json={})
-            elif command == "restart" and container_id:
-                response = await client.post(f"/api/containers/{container_id}/restart", json={})
-            elif command == "rm" and container_id:
-                params = {"force": str(force).lower()}
-                response = await client.delete(f"/api/containers/{container_id}", params=params)
-            elif command == "logs" and container_id:
-                params = {"tail": str(tail)}
-                response = await client.get(f"/api/containers/{container_id}/logs", params=params)
-            elif command == "stats" and container_id:
-                response = await client.get(f"/api/containers/{container_id}/stats")
-            elif command == "images":
-                response = await client.get("/api/images")
-            elif command == "pull" and image:
-                response = await client.post("/api/images/pull", json={"image": image, "tag": tag})
-            elif command == "rmi" and image:
-                params = {"force": str(force).lower()}
-                response = await client.delete(f"/api/images/{image}", params=params)
-            elif command == "health":
-                response = await client.get("/health")
-            elif command == "exec" and container_id:
-                exec_command = kwargs.get("exec_command")
-                if not exec_command:
-                    raise ValueError("The 'exec_command' parameter is required for the 'exec' command.")
-                response = await client.post(f"/api/containers/{container_id}/exec", json={"command": exec_command})
-            else:
-                raise ValueError(f"Unsupported command: {command}")
+    args = {
+        "container_id": container_id, "image": image, "tag": tag,
+        "force": force, "all": all, "tail": tail, "exec_command": exec_command
+    }
+    client = _get_client()
+    try:
+        spec = _COMMANDS.get(command)
+        if spec is None:
+            raise ValueError(f"Unsupported command: {command}")
+        method, path, required, build_request = spec
+        if required and not args[required]:
+            raise ValueError(f"The '{required}' parameter is required for the '{command}' command.")
+
+        response = await client.request(
+            method,
+            path.format(container_id=container_id, image=image),
+            **(build_request(args) if build_request else {})
+        )
 
-            response.raise_for_status()
+        response.raise_for_status()
+        
+        # A successful restart returns a 204 No Content, so the body is empty.
+        if response.status_code == 204:
+            return {"success": True, "message": f"Container '{container_id}' {command}ed successfully."}
             
-            # A successful restart returns a 204 No Content, so the body is empty.
-            if response.status_code == 204:
-                return {"success": True, "message": f"Container '{container_id}' {command}ed successfully."}
-                
-            return response.json()
+        return response.json()
 
-        except httpx.HTTPStatusError as e:
-            return {"error": "api_error", "status_code": e.response.status_code, "detail": e.response.text}
-        except Exception as e:
-            return {"error": "client_error", "detail": str(e)}
+    except httpx.HTTPStatusError as e:
+        return {"error": "api_error", "status_code": e.response.status_code, "detail": e.response.text}
+    except Exception as e:
+        return {"error": "client_error", "detail": str(e)}
@@ -2,9 +2,11 @@
 AHP Tools for advanced file editing, versioning, and diff application.
 This tool wraps the powerful engine from diff_engine.py and uses the StorageService.
 """
-import json
+import asyncio
 from typing import Dict, Any
 
+import orjson
+
 from gnosis_ahp.tools.base import tool
 from gnosis_ahp.core import diff_engine
 from gnosis_ahp.core.storage_service import StorageService
@@ -23,10 +25,17 @@ async def apply_diff(file_path: str, diff_text: str, change_tag: str = None, ses
 
     # Check if the file is a JSON file from save_memory
     if file_path.endswith('.json'):
+        # A malformed diff is rejected before the file is read and parsed.
+        blocks = diff_engine.parse_search_replace(diff_text)
+        if blocks is None:
+            return {"success": False, "error": "Invalid diff format"}
+        search_block, replace_block = blocks
+
         try:
             # Read the JSON file
             json_content_bytes = await storage.get_file(file_path, session_hash=session_id)
-            json_content = json.loads(json_content_bytes.decode('utf-8'))
+            # orjson reads the bytes directly, skipping a decode to str
+            json_content = orjson.loads(json_content_bytes)
             
             # Extract the raw data
             original_text = json_content.get("data")
@@ -36,31 +45,31 @@ async def apply_diff(file_path: str, diff_text: str, change_tag: str = None, ses
             # Apply the diff to the raw data
             # Note: This is a simplified diff application for this specific case.
             # We'll use the core diff_engine's fuzzy matching on the extracted text.
-            import re
-            match = re.search(r'<<<<<<< SEARCH\n(.*?)\n=======\n(.*?)\n>>>>>>> REPLACE', diff_text, re.DOTALL)
-            if not match:
-                return {"success": False, "error": "Invalid diff format"}
-            
-            search_block, replace_block = match.groups()
-            content_to_replace = diff_engine.find_fuzzy_match(search_block, original_text)
+            span = diff_engine.find_fuzzy_span(search_block, original_text)
             
-            if content_to_replace is None:
+            if span is None:
                 return {"success": False, "error": "Could not find a confident match for the SEARCH block in the file's data."}
 
-            modified_text = original_text.replace(content_to_replace, replace_block)
+            # Splice at the matched lines; the same text may also occur earlier in the data.
+            modified_text = original_text[:span[0]] + replace_block + original_text[span[1]:]
+            if modified_text == original_text:
+                return {"success": True, "changes_applied": False}
             
             # Update the JSON structure and save it back
             json_content["data"] = modified_text
-            new_json_bytes = json.dumps(json_content, indent=2).encode('utf-8')
+            new_json_bytes = orjson.dumps(json_content, option=orjson.OPT_INDENT_2)
             
-            await diff_engine.create_file_backup(storage, file_path, session_id, change_tag)
-            await storage.save_file(new_json_bytes, file_path, session_hash=session_id)
+            # The backup and the rewrite are independent writes, so they run concurrently.
+            await asyncio.gather(
+                diff_engine.create_file_backup(storage, file_path, session_id, change_tag, content=json_content_bytes),
+                storage.save_file(new_json_bytes, file_path, session_hash=session_id)
+            )
             
             return {"success": True, "changes_applied": True}
 
         except FileNotFoundError:
             return {"success": False, "error": f"File not found at {file_path}"}
-        except (json.JSONDecodeError, KeyError) as e:
+        except (orjson.JSONDecodeError, KeyError) as e:
             return {"success": False, "error": f"Error processing JSON file: {e}"}
 
     else:
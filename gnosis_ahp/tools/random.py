@@ -31,8 +31,8 @@ async def random_data(
     Returns:
         A dictionary containing the generated random values.
     """
-    if seed is not None:
-        random.seed(seed)
+    # A seeded call gets its own generator so it doesn't reseed the process-wide one.
+    rng = random.Random(seed) if seed is not None else random
 
     if count < 1:
         count = 1
@@ -58,18 +58,18 @@ async def random_data(
             if num_cards > 52:
                 num_cards = 52
             
-            result["values"] = random.sample(standard_deck, k=num_cards)
+            result["values"] = rng.sample(standard_deck, k=num_cards)
 
         elif type.lower() == "int":
             int_min, int_max = int(min), int(max)
             if int_min > int_max:
                 int_min, int_max = int_max, int_min
-            result["values"] = [random.randint(int_min, int_max) for _ in range(count)]
+            result["values"] = [rng.randint(int_min, int_max) for _ in range(count)]
 
         elif type.lower() == "float":
             if min > max:
                 min, max = max, min
-            result["values"] = [random.uniform(min, max) for _ in range(count)]
+            result["values"] = [rng.uniform(min, max) for _ in range(count)]
 
         elif type.lower() == "choice":
             if not choices:
@@ -77,10 +77,10 @@ async def random_data(
             items = [item.strip() for item in choices.split(",")]
             num_choices = int(count)
             if num_choices > len(items):
-                random.shuffle(items)
+                rng.shuffle(items)
                 result["values"] = items
             else:
-                result["values"] = random.sample(items, k=num_choices)
+                result["values"] = rng.sample(items, k=num_choices)
 
         else:
             raise ValueError(f"Invalid random type: {type}. Valid types are 'int', 'float', 'choice', 'deck'.")
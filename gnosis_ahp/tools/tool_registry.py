@@ -28,13 +28,16 @@ class ToolRegistry:
     
     RESERVED_NAMES = {
         "auth", "openapi", "schema", "session", "human_home", 
-        "robots.txt", "health", "static", "docs", "redoc"
+        "robots.txt", "health", "static", "docs", "redoc", "batch"
     }
     RESERVED_PATTERN = re.compile(r"^(auth|openapi|schema|session|docs|redoc|health)(\/.*)?$")
 
     def __init__(self):
         self.tools: Dict[str, Dict[str, Any]] = {}
         self.categories: Dict[str, Set[str]] = defaultdict(set)
+        # Names of tools with a non-zero cost, kept current by register() so the
+        # payment middleware can skip free tools with one set lookup.
+        self.paid_tools: Set[str] = set()
         
     def is_reserved(self, name: str) -> bool:
         """Check if a tool name conflicts with a reserved path."""
@@ -72,6 +75,11 @@ class ToolRegistry:
         if category:
             self.categories[category].add(tool_instance.name)
         
+        if getattr(tool_instance, "cost", 0) > 0:
+            self.paid_tools.add(tool_instance.name)
+        else:
+            self.paid_tools.discard(tool_instance.name)
+        
         logger.info(f"Registered tool: {tool_instance.name} (category: {category or 'general'})")
     
     def discover_tools(self, path: Union[str, Path], strict: bool = False) -> List[Dict[str, Any]]:
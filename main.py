@@ -1,8 +1,10 @@
 import os
+import asyncio
 import logging
 import uuid
 import json
 import hmac
+import hashlib
 from typing import Dict, Any, AsyncGenerator
 from dotenv import load_dotenv
 
@@ -16,6 +18,7 @@ from gnosis_ahp.tools.tool_registry import get_global_registry, ToolError
 from gnosis_ahp.core.storage_service import StorageService
 from gnosis_ahp.core.aperture_service import get_aperture_service
 from gnosis_ahp.core.middleware import ApertureMiddleware, ContentTypeMiddleware
+from gnosis_ahp.core.http_clients import close_http_clients
 from gnosis_ahp.core.errors import (
     AHPException,
     ahp_exception_handler,
@@ -25,6 +28,8 @@ from gnosis_ahp.core.errors import (
     tool_not_found_exception,
     session_not_found_exception,
     tool_execution_exception,
+    invalid_batch_exception,
+    invalid_request_body_exception,
     internal_server_error_exception,
 )
 
@@ -43,14 +48,33 @@ HOST = os.getenv("HOST", "0.0.0.0")
 
 # --- Auth Dependency ---
 async def verify_token(request: Request) -> Dict[str, Any]:
-    """A dependency to verify the bearer token for protected routes."""
-    bearer_token = request.query_params.get("bearer_token")
+    """
+    A dependency to verify the bearer token for protected routes.
+    The token is read from an 'Authorization: Bearer ...' header, falling back to the 'bearer_token' query parameter.
+    """
+    authorization = request.headers.get("Authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        bearer_token = authorization[7:].strip()
+    else:
+        bearer_token = request.query_params.get("bearer_token")
     if not bearer_token:
         raise missing_bearer_token_exception()
     
     auth_info = validate_token_from_query(bearer_token, secret_key=AHP_TOKEN)
     return auth_info
 
+async def resolve_session(session_id: str, agent_id: str) -> Dict[str, Any]:
+    """Validates a session ID and builds the session context passed to tools."""
+    if not session_id:
+        return None
+    storage = StorageService(user_email=agent_id)
+    if not await storage.validate_session(session_id):
+        raise session_not_found_exception(session_id)
+    return {
+        "id": session_id,
+        "storage": storage
+    }
+
 # --- FastAPI App & Routers ---
 app = FastAPI(
     title="AI Hypercall Protocol (AHP) Server",
@@ -110,8 +134,8 @@ def favicon():
 
 @ui_router.get("/client", response_class=FileResponse)
 async def get_client_proxy():
-    """Serves the ahp_proxy.py script as a reference client implementation."""
-    return "ahp_proxy.py"
+    """Serves the ahp_client.py module as a reference client implementation."""
+    return "ahp_client.py"
 
 @ui_router.get("/robots.txt", response_class=FileResponse)
 async def robots():
@@ -131,10 +155,10 @@ async def check_payment_status(invoice_id: str):
 async def auth_endpoint(token: str, agent_id: str = "default_agent"):
     """Provides a temporary bearer token for tool usage."""
     if not token or not hmac.compare_digest(token, AHP_TOKEN):
-        logger.error(f"Authentication failed. Received token: '{token}', Expected AHP_TOKEN: '{AHP_TOKEN}'")
+        logger.warning("Authentication failed for agent '%s': invalid pre-shared token.", agent_id)
         raise invalid_token_exception("Invalid authentication token provided.")
         
-    logger.info(f"AUTH request received for agent '{agent_id}' with token: '{token}'")
+    logger.info("AUTH request received for agent '%s'.", agent_id)
     new_token = generate_token(agent_id=agent_id, secret_key=AHP_TOKEN)
     return JSONResponse({
         "message": f"Authentication successful for agent '{agent_id}'.",
@@ -170,9 +194,16 @@ async def openapi_endpoint():
     return JSONResponse(app.openapi_schema)
 
 @ui_router.get("/tools", tags=["AHP Core"])
-def tools_endpoint():
-    """Returns the schemas of all available tools."""
-    return JSONResponse(tool_registry.get_schemas())
+def tools_endpoint(request: Request):
+    """
+    Returns the schemas of all available tools.
+    Sends an ETag so clients holding a cached copy get a bodiless 304 via If-None-Match.
+    """
+    body = json.dumps(tool_registry.get_schemas()).encode("utf-8")
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @ui_router.get("/human_home", response_class=HTMLResponse, tags=["AHP Core"])
 def human_home_endpoint(request: Request):
@@ -220,32 +251,103 @@ async def session_start_endpoint(auth_info: Dict[str, Any] = Depends(verify_toke
         "agent_id": agent_id
     })
 
+@api_router.post("/batch", tags=["AHP Core"])
+async def batch_endpoint(request: Request, auth_info: Dict[str, Any] = Depends(verify_token)):
+    """
+    Executes several tool calls in a single request.
+    The body is `{"requests": {"<id>": {"tool": "<name>", "params": {...}}}}`; the calls run
+    concurrently and the response maps each id to its result or error.
+    """
+    try:
+        body = await request.json()
+        calls = body["requests"]
+        if not isinstance(calls, dict):
+            raise TypeError("'requests' must be an object")
+    except (ValueError, KeyError, TypeError) as e:
+        raise invalid_batch_exception(str(e))
+
+    # Check every entry's shape before anything runs, so a malformed call can't fail inside gather.
+    for call_id, call in calls.items():
+        if not isinstance(call, dict):
+            raise invalid_batch_exception(f"request '{call_id}' must be an object")
+        if not isinstance(call.get("tool"), str):
+            raise invalid_batch_exception(f"request '{call_id}' needs a string 'tool'")
+        if not isinstance(call.get("params") or {}, dict):
+            raise invalid_batch_exception(f"'params' of request '{call_id}' must be an object")
+
+    agent_id = auth_info.get("agent_id", "default_agent")
+    session_id = request.query_params.get("session_id")
+    session = await resolve_session(session_id, agent_id)
+
+    tool_context = {"agent_id": agent_id}
+    if session:
+        tool_context["session"] = session
+
+    async def run_call(call: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = call.get("tool")
+        params = dict(call.get("params") or {})
+        params.pop("agent_id", None)
+        params.pop("session", None)
+        try:
+            try:
+                tool_instance = tool_registry.get_tool(tool_name)
+            except ToolError as e:
+                raise tool_not_found_exception(tool_name) from e
+            # Paid tools need the per-request invoice flow handled by ApertureMiddleware.
+            if tool_instance.cost > 0:
+                raise tool_execution_exception(tool_name, "paid tools cannot be called in a batch.")
+
+            result = await tool_instance.execute(**params, **tool_context)
+            if not result.success:
+                raise tool_execution_exception(tool_name, result.error)
+            return {"tool": tool_name, "result": result.data}
+        except AHPException as e:
+            return {"tool": tool_name, "error": e.detail["error"]}
+
+    call_ids = list(calls)
+    results = await asyncio.gather(*[run_call(calls[call_id]) for call_id in call_ids])
+    return JSONResponse({
+        "responses": dict(zip(call_ids, results)),
+        "session_id": session_id
+    })
+
 @api_router.get("/{tool_name}", tags=["AHP Tools"])
 async def tool_endpoint(tool_name: str, request: Request, auth_info: Dict[str, Any] = Depends(verify_token)):
     """
     Dynamically handles tool execution based on the URL path.
     """
+    return await execute_tool_request(tool_name, dict(request.query_params), auth_info)
+
+@api_router.post("/{tool_name}", tags=["AHP Tools"])
+async def tool_post_endpoint(tool_name: str, request: Request, auth_info: Dict[str, Any] = Depends(verify_token)):
+    """
+    Executes a tool with parameters from the query string and a JSON object body.
+    Large values such as diffs travel in the body instead of being URL-encoded.
+    """
+    params = dict(request.query_params)
+    try:
+        body = await request.json()
+    except ValueError as e:
+        raise invalid_request_body_exception(str(e))
+    if not isinstance(body, dict):
+        raise invalid_request_body_exception("the body must be a JSON object.")
+    params.update(body)
+    return await execute_tool_request(tool_name, params, auth_info)
+
+async def execute_tool_request(tool_name: str, params: Dict[str, Any], auth_info: Dict[str, Any]):
+    """Runs a tool for an authenticated request and builds the HTTP response."""
     logger.info(f"Tool endpoint called for tool: '{tool_name}'")
     logger.info(f"Available tools: {list(tool_registry.tools.keys())}")
-    
-    params = dict(request.query_params)
+
     params.pop("bearer_token", None)
 
     agent_id = auth_info.get("agent_id", "default_agent")
     logger.info(f"Authenticated agent: '{agent_id}'")
 
     session_id = params.pop("session_id", None)
-    session = None
-    if session_id:
-        storage = StorageService(user_email=agent_id)
-        if not await storage.validate_session(session_id):
-            raise session_not_found_exception(session_id)
-        session = {
-            "id": session_id,
-            "storage": storage
-        }
-
-    is_streaming = params.pop("stream", "false").lower() == "true"
+    session = await resolve_session(session_id, agent_id)
+
+    is_streaming = str(params.pop("stream", "false")).lower() == "true"
 
     tool_context = {"agent_id": agent_id}
     if session:
@@ -299,6 +401,11 @@ def startup_event():
     tool_registry.discover_tools(tools_path)
     logger.info(f"Discovered tools: {list(tool_registry.tools.keys())}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """On server shutdown, close pooled connections held for tools."""
+    await close_http_clients()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host=HOST, port=PORT, reload=True)
\ No newline at end of file
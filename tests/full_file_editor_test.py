@@ -1,80 +1,94 @@
-import requests
+import asyncio
+import importlib.util
 import json
-import urllib.parse
+import httpx
 
 # --- Configuration ---
 BASE_URL = "https://ahp.nuts.services"
 # BASE_URL = "http://localhost:8080" # Uncomment for local testing
+PRE_SHARED_TOKEN = "wUT4h3FU3K"
+# PRE_SHARED_TOKEN = "f00bar"
 
-def get_json_or_exit(response, step_name):
-    """Helper function to decode JSON or print error and exit."""
+# Number of independent auth -> session -> save -> diff flows to run concurrently.
+FLOWS = 10
+
+class FlowError(Exception):
+    """Raised when a step of a flow fails."""
+
+def get_json_or_raise(response, step_name):
+    """Helper function to decode JSON or raise a FlowError describing the response."""
     try:
         return response.json()
     except json.JSONDecodeError:
-        print(f"Error decoding JSON from {step_name}. Status code: {response.status_code}")
-        print(f"Response text: {response.text}")
-        exit()
+        raise FlowError(
+            f"Error decoding JSON from {step_name}. Status code: {response.status_code}\n"
+            f"Response text: {response.content[:512].decode('utf-8', 'replace')}"
+        )
 
-# --- Step 1: Get a new Bearer Token ---
-print(f"Attempting to get bearer token from {BASE_URL}...")
-auth_url = f"{BASE_URL}/auth?token=wUT4h3FU3K"
-# auth_url = f"{BASE_URL}/auth?token=f00bar"
-auth_response = requests.get(auth_url)
-auth_data = get_json_or_exit(auth_response, "auth endpoint")
-    
-bearer_token = auth_data.get("bearer_token")
-if not bearer_token:
-    print("Failed to get bearer token.")
-    exit()
-print(f"Successfully obtained bearer token: {bearer_token}")
+async def run_flow(client, idx):
+    """Runs the four dependent steps of one flow; separate flows overlap their network waits."""
+    # --- Step 1: Get a new Bearer Token ---
+    auth_response = await client.get("/auth", params={"token": PRE_SHARED_TOKEN})
+    auth_data = get_json_or_raise(auth_response, "auth endpoint")
+    bearer_token = auth_data.get("bearer_token")
+    if not bearer_token:
+        raise FlowError("Failed to get bearer token.")
+    print(f"[flow {idx}] Obtained bearer token.")
 
-# --- Step 2: Start a Session ---
-print(f"\nAttempting to start session...")
-session_url = f"{BASE_URL}/session/start?bearer_token={bearer_token}"
-session_response = requests.get(session_url)
-session_data = get_json_or_exit(session_response, "session start")
+    # --- Step 2: Start a Session ---
+    session_response = await client.get("/session/start", params={"bearer_token": bearer_token})
+    session_data = get_json_or_raise(session_response, "session start")
+    session_id = session_data.get("session_id")
+    if not session_id:
+        raise FlowError("Failed to start session.")
+    print(f"[flow {idx}] Started session: {session_id}")
 
-session_id = session_data.get("session_id")
-if not session_id:
-    print("Failed to start session.")
-    exit()
-print(f"Successfully started session: {session_id}")
+    # --- Step 3: Save the initial file content to the session ---
+    file_name = f"test_file_for_diff_{idx}"
+    file_content = "Line 1: This is the first line.\nLine 2: This is the second line.\nLine 3: This is the third line."
+    save_params = {
+        "bearer_token": bearer_token,
+        "session_id": session_id,
+        "name": file_name, # This will be the filename
+        "data": file_content
+    }
+    save_response = await client.get("/save_memory", params=save_params)
+    save_data = get_json_or_raise(save_response, "save memory")
+    print(f"[flow {idx}] Result of saving file: {save_data}")
 
-# --- Step 3: Save the initial file content to the session ---
-print("\nAttempting to save file...")
-save_url = f"{BASE_URL}/save_memory"
-file_content = "Line 1: This is the first line.\nLine 2: This is the second line.\nLine 3: This is the third line."
-save_params = {
-    "bearer_token": bearer_token,
-    "session_id": session_id,
-    "name": "test_file_for_diff", # This will be the filename
-    "data": file_content
-}
-save_full_url = f"{save_url}?{urllib.parse.urlencode(save_params)}"
-save_response = requests.get(save_full_url)
-save_data = get_json_or_exit(save_response, "save memory")
-print("\nResult of saving file:")
-print(save_data)
-
-# --- Step 4: Apply the Diff ---
-print("\nAttempting to apply diff...")
-diff_text = """<<<<<<< SEARCH
+    # --- Step 4: Apply the Diff ---
+    diff_text = """<<<<<<< SEARCH
 Line 2: This is the second line.
 =======
 Line 2: This is the modified line.
 >>>>>>> REPLACE"""
+    diff_params = {
+        "bearer_token": bearer_token,
+        "session_id": session_id,
+        "file_path": f"{file_name}.json",
+        "diff_text": diff_text
+    }
+    diff_response = await client.get("/apply_diff", params=diff_params)
+    diff_data = get_json_or_raise(diff_response, "apply diff")
+    print(f"[flow {idx}] Result of apply_diff: {diff_data}")
+    return diff_data
+
+async def main():
+    # HTTP/2 (when h2 is installed) multiplexes every flow over one connection.
+    http2 = importlib.util.find_spec("h2") is not None
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        http2=http2,
+        limits=httpx.Limits(max_connections=16),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    ) as client:
+        print(f"Running {FLOWS} concurrent flows against {BASE_URL}...")
+        results = await asyncio.gather(*[run_flow(client, i) for i in range(FLOWS)], return_exceptions=True)
 
-diff_url = f"{BASE_URL}/apply_diff"
-file_path = "test_file_for_diff.json" 
+    failures = [(i, r) for i, r in enumerate(results) if isinstance(r, Exception)]
+    for i, error in failures:
+        print(f"[flow {i}] FAILED: {error}")
+    print(f"\n{FLOWS - len(failures)}/{FLOWS} flows succeeded.")
 
-diff_params = {
-    "bearer_token": bearer_token,
-    "session_id": session_id,
-    "file_path": file_path,
-    "diff_text": diff_text
-}
-diff_full_url = f"{diff_url}?{urllib.parse.urlencode(diff_params)}"
-diff_response = requests.get(diff_full_url)
-diff_data = get_json_or_exit(diff_response, "apply diff")
-print("\nResult of apply_diff:")
-print(diff_data)
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
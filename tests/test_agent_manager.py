@@ -0,0 +1,33 @@
+from gnosis_ahp.tools.agent_manager import list_agents, load_all_agents
+
+class FakeStorage:
+    """An in-memory stand-in for StorageService listing one agent, one non-JSON file and a subdirectory."""
+
+    files = {
+        "agents/Viek.json": b'{"name": "Viek"}',
+        "agents/notes.txt": b"not an agent",
+    }
+
+    async def list_files(self, prefix=None, session_hash=None):
+        listing = [{"name": name, "type": "file"} for name in self.files]
+        return listing + [{"name": "agents/archive.json", "type": "directory"}]
+
+    async def get_file(self, filename, session_hash=None):
+        return self.files[filename]
+
+SESSION = {"storage": FakeStorage(), "id": "s"}
+
+# ==================================
+# Test Cases
+# ==================================
+
+async def test_list_agents_names():
+    """Test that only .json files are listed, without their directory or suffix."""
+    assert await list_agents(session=SESSION) == {"success": True, "count": 1, "agents": ["Viek"]}
+
+async def test_load_all_agents_matches_list_agents():
+    """Test that load_all_agents reads exactly the agents list_agents reports."""
+    listed = await list_agents(session=SESSION)
+    loaded = await load_all_agents(session=SESSION)
+    assert "errors" not in loaded
+    assert [agent["name"] for agent in loaded["agents"]] == listed["agents"]
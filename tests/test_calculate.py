@@ -0,0 +1,48 @@
+from gnosis_ahp.tools.calculate import calculate
+
+# ==================================
+# Test Cases
+# ==================================
+
+async def test_calculate_arithmetic():
+    """Test operators, precedence and the ^ power alias."""
+    assert await calculate("2 + 3 * 4") == {"success": True, "result": 14}
+    assert await calculate("2^10") == {"success": True, "result": 1024}
+    assert await calculate("-3 + +2") == {"success": True, "result": -1}
+
+async def test_calculate_math_functions():
+    """Test that whitelisted names and functions resolve."""
+    assert await calculate("sqrt(16) + floor(pi)") == {"success": True, "result": 7.0}
+    assert await calculate("round(3.14159, 2)") == {"success": True, "result": 3.14}
+
+async def test_calculate_sequence_literals():
+    """Test that list and tuple literals of numbers can be passed to max/min/sum."""
+    assert await calculate("max([1, 2, 3])") == {"success": True, "result": 3}
+    assert await calculate("sum((1, 2))") == {"success": True, "result": 3}
+    assert await calculate("min([2 * 3, sqrt(4)])") == {"success": True, "result": 2.0}
+    assert (await calculate("max([[1], [2]])"))["success"] is False
+
+async def test_calculate_comparisons():
+    """Test comparison and boolean operators, which the eval-based version accepted."""
+    assert await calculate("2 > 1") == {"success": True, "result": True}
+    assert await calculate("1 < 2 < 2") == {"success": True, "result": False}
+    assert await calculate("not (1 == 2) and 3 >= 3") == {"success": True, "result": True}
+
+async def test_calculate_rejects_runaway_operations():
+    """Test that huge powers and factorials are refused instead of blocking the event loop."""
+    for expression in ("9**9**9", "2^(10**6)", "(10**1000)**1000", "factorial(10**7)"):
+        result = await calculate(expression)
+        assert result["success"] is False
+        assert "too large" in result["reason"] or "at most" in result["reason"]
+    assert await calculate("factorial(5) + 2**100") == {"success": True, "result": 120 + 2**100}
+
+async def test_calculate_rejects_unknown_names():
+    """Test that names outside the whitelist are not resolved."""
+    result = await calculate("__import__('os')")
+    assert result["success"] is False
+
+async def test_calculate_rejects_attribute_access():
+    """Test that attribute tricks are refused instead of evaluated."""
+    result = await calculate("().__class__")
+    assert result["success"] is False
+    assert "Attribute" in result["reason"]
@@ -1,6 +1,5 @@
 import requests
 import json
-import urllib.parse
 
 # --- Step 1: Get a new Bearer Token ---
 auth_url = "http://localhost:8080/auth?token=f00bar"
@@ -29,22 +28,29 @@ print(f"Successfully started session: {session_id}")
 # --- Step 3: Apply the Diff ---
 diff_text = """<<<<<<< SEARCH
 Line 2: This is the second line.
-======= 
+=======
 Line 2: This is the modified line.
 >>>>>>> REPLACE"""
 
+# Reject a malformed diff locally instead of paying a round trip for the server's error.
+# These are the exact markers the server's parser requires.
+DIFF_MARKERS = ("<<<<<<< SEARCH\n", "\n=======\n", "\n>>>>>>> REPLACE")
+missing_markers = [marker.strip() for marker in DIFF_MARKERS if marker not in diff_text]
+if missing_markers:
+    print(f"Malformed diff: missing {missing_markers}")
+    exit()
+
 base_url = "http://localhost:8080/apply_diff"
 file_path = "test_file_for_diff.txt" # Path is now relative to the session storage
 
 params = {
     "bearer_token": bearer_token,
     "session_id": session_id,
-    "file_path": file_path,
-    "diff_text": diff_text
+    "file_path": file_path
 }
 
-full_url = f"{base_url}?{urllib.parse.urlencode(params)}"
-response = requests.get(full_url)
+# The diff travels in the request body rather than being URL-encoded into the query string.
+response = requests.post(base_url, params=params, json={"diff_text": diff_text})
 
 print("\nResult of apply_diff:")
-print(response.json())
\ No newline at end of file
+print(response.json())
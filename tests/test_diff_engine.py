@@ -0,0 +1,85 @@
+import json
+
+from gnosis_ahp.core.diff_engine import file_diff_write, find_fuzzy_match, find_fuzzy_span, parse_search_replace
+from gnosis_ahp.tools.file_editor import apply_diff
+
+CONTENT = "\n".join(f"Line {i}: This is line number {i}." for i in range(1, 11))
+
+class FakeStorage:
+    """An in-memory stand-in for StorageService with just the calls the diff paths make."""
+
+    def __init__(self, files):
+        self.files = dict(files)
+
+    async def get_file(self, filename, session_hash=None):
+        if filename not in self.files:
+            raise FileNotFoundError(filename)
+        return self.files[filename]
+
+    async def save_file(self, content, filename, session_hash=None):
+        self.files[filename] = content.encode('utf-8') if isinstance(content, str) else content
+
+    async def list_files(self, prefix=None, session_hash=None):
+        raise FileNotFoundError(prefix)
+
+def make_diff(search, replace):
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+
+# ==================================
+# Test Cases
+# ==================================
+
+def test_fuzzy_match_exact_block():
+    """Test that a verbatim SEARCH block is matched."""
+    search = "Line 2: This is line number 2.\nLine 3: This is line number 3."
+    assert find_fuzzy_match(search, CONTENT) == search
+
+def test_fuzzy_match_requires_whole_lines():
+    """Test that text found only mid-line is not treated as a match."""
+    assert find_fuzzy_match("This is line number 2", CONTENT) is None
+
+def test_fuzzy_match_near_miss():
+    """Test that a block with one changed line still resolves to the original lines."""
+    search = "\n".join(f"Line {i}: This is line number {i}." for i in range(4, 8)).replace("number 5", "numbr 5")
+    expected = "\n".join(f"Line {i}: This is line number {i}." for i in range(4, 8))
+    assert find_fuzzy_match(search, CONTENT) == expected
+
+def test_fuzzy_match_no_confident_match():
+    """Test that unrelated text is not matched."""
+    assert find_fuzzy_match("Something else entirely", CONTENT) is None
+
+def test_parse_search_replace():
+    """Test that the SEARCH and REPLACE blocks are extracted."""
+    diff = "<<<<<<< SEARCH\nold line\n=======\nnew line\n>>>>>>> REPLACE"
+    assert parse_search_replace(diff) == ("old line", "new line")
+
+def test_parse_search_replace_empty_replace():
+    """Test that an empty REPLACE block is allowed."""
+    diff = "<<<<<<< SEARCH\nold line\n=======\n\n>>>>>>> REPLACE"
+    assert parse_search_replace(diff) == ("old line", "")
+
+def test_parse_search_replace_malformed():
+    """Test that a diff with a missing or malformed marker is rejected."""
+    assert parse_search_replace("<<<<<<< SEARCH\nold line\n=======\nnew line") is None
+    assert parse_search_replace("<<<<<<< SEARCH\nold line\n======= \nnew line\n>>>>>>> REPLACE") is None
+
+def test_fuzzy_span_skips_mid_line_text():
+    """Test that the span covers the whole-line match, not an earlier mid-line occurrence."""
+    content = 'x = "Line 2"\nLine 2\n'
+    start, end = find_fuzzy_span("Line 2", content)
+    assert (start, end) == (13, 19)
+
+async def test_file_diff_write_fuzzy_edits_matched_lines():
+    """Test that a fuzzy edit replaces the matched lines even when their text also occurs mid-line earlier."""
+    storage = FakeStorage({"notes.txt": b"zzc\nd\nY\nr\nsep\nc\nd\nY\nr\n"})
+    result = await file_diff_write(storage, "notes.txt", "s", make_diff("c\nd\nX\nr", "NEW"))
+    assert result == {"success": True, "changes_applied": True}
+    assert storage.files["notes.txt"] == b"zzc\nd\nY\nr\nsep\nNEW\n"
+
+async def test_apply_diff_json_edits_matched_line():
+    """Test that the save_memory JSON branch edits the matched line, not the same text inside an earlier line."""
+    storage = FakeStorage({"memo.json": json.dumps({"data": 'x = "Line 2"\nLine 2\n'}).encode('utf-8')})
+    session = {"storage": storage, "id": "s"}
+    result = await apply_diff("memo.json", make_diff("Line 2", "NEW"), session=session)
+    assert result == {"success": True, "changes_applied": True}
+    assert json.loads(storage.files["memo.json"])["data"] == 'x = "Line 2"\nNEW\n'
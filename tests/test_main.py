@@ -2,11 +2,13 @@ import pytest
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 import os
+from collections import OrderedDict
 
 # Set a dummy token for testing purposes before importing the app
 os.environ["AHP_TOKEN"] = "test_pre_shared_key"
 
 from main import app
+from gnosis_ahp.core.errors import AHPException
 
 @pytest.fixture
 def client():
@@ -54,6 +56,17 @@ def test_unknown_function(client):
     assert error["code"] == "unknown_function"
     assert "Unknown function 'nonexistent'" in error["message"]
 
+def test_tools_etag_not_modified(client):
+    """Test that /tools answers a matching If-None-Match with a bodiless 304."""
+    response = client.get("/tools")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert isinstance(response.json(), list)
+
+    response = client.get("/tools", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
 # --- Auth Tests ---
 
 def test_auth_success(client):
@@ -80,6 +93,40 @@ def test_auth_invalid_token(client):
     assert error["code"] == "invalid_access_token"
     assert "Invalid or missing pre-shared access token" in error["message"]
 
+@pytest.fixture
+def token_cache(monkeypatch):
+    """An empty verified-token cache for one test, so its entries don't leak into others."""
+    from gnosis_ahp import auth
+    cache = OrderedDict()
+    monkeypatch.setattr(auth, "_token_cache", cache)
+    return cache
+
+def assert_invalid_bearer(exc_info, message):
+    """Checks that a validation failure is the invalid_bearer_token error with the given message."""
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail["error"]["code"] == "invalid_bearer_token"
+    assert message in exc_info.value.detail["error"]["message"]
+
+def test_validated_token_cache(token_cache):
+    """Test that a verified token is served from the cache and still expires."""
+    from gnosis_ahp import auth
+
+    token = auth.generate_token(agent_id="cache_agent", secret_key="test_pre_shared_key")
+    assert auth.validate_token_from_query(token, "test_pre_shared_key") == {"agent_id": "cache_agent"}
+    assert ("test_pre_shared_key", token) in token_cache
+    assert auth.validate_token_from_query(token, "test_pre_shared_key") == {"agent_id": "cache_agent"}
+
+    # A token verified under one key is not accepted under another.
+    with pytest.raises(AHPException) as exc_info:
+        auth.validate_token_from_query(token, "another_key")
+    assert_invalid_bearer(exc_info, "Invalid token signature.")
+
+    token_cache[("test_pre_shared_key", token)] = ("cache_agent", 0)
+    with pytest.raises(AHPException) as exc_info:
+        auth.validate_token_from_query(token, "test_pre_shared_key")
+    assert_invalid_bearer(exc_info, "Bearer token has expired.")
+    assert ("test_pre_shared_key", token) not in token_cache
+
 # --- Tool Call Tests ---
 
 @pytest.mark.asyncio
@@ -124,3 +171,33 @@ async def async_test_tool_not_found(async_client: AsyncClient, client: TestClien
     error = response.json()["error"]
     assert error["code"] == "tool_not_found"
     assert "Tool 'nonexistent_tool' not found" in error["message"]
+
+# --- Batch Tests ---
+
+def test_batch_invalid_body(client):
+    """Test that a batch request without a 'requests' object is rejected."""
+    bearer_token = client.get("/auth?token=test_pre_shared_key").json()["bearer_token"]
+    response = client.post(f"/batch?bearer_token={bearer_token}", json={"calls": []})
+    assert response.status_code == 400
+    error = response.json()["error"]
+    assert error["code"] == "invalid_batch_request"
+
+def test_batch_malformed_entries(client):
+    """Test that entries that aren't {"tool": str, "params": object} are rejected instead of crashing."""
+    bearer_token = client.get("/auth?token=test_pre_shared_key").json()["bearer_token"]
+    for calls in ({"a": [1]}, {"a": {"params": {}}}, {"a": {"tool": "calculate", "params": [1]}}):
+        response = client.post(f"/batch?bearer_token={bearer_token}", json={"requests": calls})
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == "invalid_batch_request"
+
+def test_batch_reports_per_call_errors(client):
+    """Test that a failing call in a batch is reported under its own id."""
+    bearer_token = client.get("/auth?token=test_pre_shared_key").json()["bearer_token"]
+    response = client.post(
+        f"/batch?bearer_token={bearer_token}",
+        json={"requests": {"a": {"tool": "nonexistent_tool", "params": {}}}}
+    )
+    assert response.status_code == 200
+    result = response.json()["responses"]["a"]
+    assert result["tool"] == "nonexistent_tool"
+    assert result["error"]["code"] == "tool_not_found"